@@ -1,4 +1,5 @@
 import os
+import random
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,7 +10,9 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 
 # Cache TTL settings (in seconds)
 CACHE_TTL = {
-    'quote': 0,              # No cache (always fresh)
+    'quote': 10,             # 10 seconds (near real-time)
+    'market': 60,            # 1 minute (computed market snapshot)
+    'indicators': 900,       # 15 minutes (MarketCalculator results, hourly keys)
     'news': 0,               # No cache (always fresh)
     'candles': 86400,        # 1 day
     'financials': 86400,     # 1 day
@@ -20,5 +23,48 @@ CACHE_TTL = {
     'earnings': 86400        # 1 day
 }
 
+# On-disk yfinance history cache (entries expire after CACHE_TTL['candles'])
+HISTORY_CACHE_DIR = os.getenv("HISTORY_CACHE_DIR", ".cache/history")
+
+# Where MarketCalculator downloads daily history from: "yfinance", or "chart"
+# to read Yahoo's v8 chart JSON directly (no DataFrame/timezone/actions work)
+HISTORY_SOURCE = os.getenv("HISTORY_SOURCE", "yfinance")
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+
+# Relative +/- jitter so short-lived keys written together don't expire together
+CACHE_TTL_JITTER = {
+    'quote': 0.2,
+    'market': 0.1,
+}
+
+
+def ttl_for(kind: str) -> int:
+    """Get the cache TTL for a data kind, with jitter applied if configured.
+
+    Args:
+        kind: Key of CACHE_TTL (e.g. "quote", "market")
+
+    Returns:
+        TTL in seconds
+    """
+    base = CACHE_TTL[kind]
+    jitter = CACHE_TTL_JITTER.get(kind, 0.0)
+    return max(1, int(base * (1 + random.uniform(-jitter, jitter)))) if base else 0
+
+# Finnhub trade stream used to evict cached quotes as trades print
+FINNHUB_WS_URL = "wss://ws.finnhub.io?token={token}"
+
 # Rate limiting
 RATE_LIMIT_PER_MINUTE = 60
+
+# XFetch probabilistic early refresh: higher beta refreshes earlier (0 disables it)
+XFETCH_BETA = 1.0
+
+# Upper bound (seconds) on a single retry sleep and on the total slept per request
+RETRY_MAX_DELAY = 30
+
+# Maximum number of fetch_market calls running at once in async fan-outs
+MARKET_FETCH_CONCURRENCY = 4
+
+# Keep-alive HTTP connections held open to the Finnhub API
+HTTP_POOL_SIZE = 20
@@ -1,28 +1,22 @@
-from enum import Enum
-from dataclasses import dataclass
-import sys
-from pathlib import Path
-import FastAPI
+import threading
 
-sys.path.append(str(Path(__file__).resolve().parents[1]))
-
-from data import data_provider
 from data import cache_manager
 from data import market_calculator
 from core import regime_guardian
-from config import settings
+from config import symbols
 
-@dataclass
 class Maestro:
-    
-    def __post_init__(self):
+
+    __slots__ = ("cache", "mc", "rg", "dp")
+
+    def __init__(self):
         self.cache = cache_manager.CacheManager()
-        self.mc = market_calculator.MarketCalculator()
-        self.rg = regime_guardian.RegimeGuardian()
-        self.dp = data_provider.DataProvider()
+        self.mc = market_calculator.MarketCalculator(cache=self.cache)
+        self.rg = regime_guardian.RegimeGuardian(cache=self.cache, mc=self.mc)
+        self.dp = self.mc.data_provider
     
     
-    def start():
+    def start(self):
         """Starts the actual workflow
          1-> Get the user configs for symbols
          2-> Fetch the relevant data
@@ -30,7 +24,12 @@ class Maestro:
          4-> With the data & calculation decide regime and veto if needed
          5-> Prepare data for the agents
         """
-        maestro = Maestro()
+        # Drop L1 entries that other processes invalidate
+        self.cache.listen()
+        # Warm the long-TTL caches for the watchlist without blocking startup
+        threading.Thread(target=self.dp.warm, args=(symbols.symbols,), daemon=True).start()
+        # Evict cached quotes as trades print instead of waiting out the TTL
+        self.dp.listen_trades(symbols.symbols)
         
         
         
\ No newline at end of file
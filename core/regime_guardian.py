@@ -1,12 +1,8 @@
+import asyncio
 from enum import Enum
-from dataclasses import dataclass
-import sys
-from pathlib import Path
-import pandas as pd
+from types import SimpleNamespace
+import numpy as np
 
-sys.path.append(str(Path(__file__).resolve().parents[1]))
-
-from data import data_provider
 from data import cache_manager
 from data import market_calculator
 from config import settings
@@ -20,31 +16,215 @@ class MarketRegime(Enum):
     RANGE_BOUND = "RANGE_BOUND" # Market moving within a defined range
     LOW_LIQUIDITY = "LOW_LIQUIDITY" # Reduced market liquidity conditions
 
-@dataclass
+
+# Regime names as plain strings (the public API returns str, not the enum)
+_BULL_TREND = MarketRegime.BULL_TREND.value
+_BEAR_TREND = MarketRegime.BEAR_TREND.value
+_VOLATILITY_SPIKE = MarketRegime.VOLATILITY_SPIKE.value
+_STAGNATION = MarketRegime.STAGNATION.value
+_RANGE_BOUND = MarketRegime.RANGE_BOUND.value
+_LOW_LIQUIDITY = MarketRegime.LOW_LIQUIDITY.value
+
+# Indicator code sets used for membership tests
+_BULL_MACD = frozenset((0, 1))  # strong bullish or bullish
+_BEAR_MACD = frozenset((2, 3))  # strong bearish or bearish
+_BULL_BB_POS = frozenset(("far_above", "above_upper"))
+_BEAR_BB_POS = frozenset(("far_below", "below_lower"))
+
+
+# ========================================
+# VETO RULE TABLES: (predicate(facts), reason)
+# ========================================
+
+# Always block trade, first match wins
+_CRITICAL_RULES = (
+    (lambda f: f.regime == _VOLATILITY_SPIKE, "Market volatility too high (VIX > 30)"),
+    (lambda f: f.regime == _LOW_LIQUIDITY, "Insufficient market liquidity"),
+    (lambda f: f.volume_liquidity == "low", "Low trading volume detected"),
+)
+
+_BULL_TREND_RULES = (
+    (lambda f: f.rsi > 75, "Severely overbought (RSI > 75)"),
+    (lambda f: f.obv_divergence == "bearish", "Bearish volume divergence - smart money exiting"),
+    (lambda f: f.bollinger_position in _BULL_BB_POS, "Price overextended above Bollinger upper band"),
+    (lambda f: f.vix > 25, "VIX elevated despite bullish setup"),
+)
+
+_BEAR_TREND_RULES = (
+    (lambda f: f.rsi < 25, "Severely oversold (RSI < 25)"),
+    (lambda f: f.obv_divergence == "bullish", "Bullish volume divergence - smart money accumulating"),
+    (lambda f: f.bollinger_position in _BEAR_BB_POS, "Price overextended below Bollinger lower band"),
+    (lambda f: f.vix > 40, "VIX extremely high - panic selling, reversal risk"),
+)
+
+_RANGE_BOUND_RULES = (
+    (lambda f: f.volume_liquidity == "low", "Low volume in range - false breakout risk"),
+    (lambda f: 20 < f.adx < 25, "ADX rising - range may be breaking soon"),
+    (lambda f: f.bandwidth < 0.05, "Bollinger bands extremely narrow - breakout imminent"),
+)
+
+_STAGNATION_RULES = (
+    (lambda f: True, "Market stagnant - low profit opportunity"),
+)
+
+_REGIME_RULES = {
+    _BULL_TREND: _BULL_TREND_RULES,
+    _BEAR_TREND: _BEAR_TREND_RULES,
+    _RANGE_BOUND: _RANGE_BOUND_RULES,
+    _STAGNATION: _STAGNATION_RULES,
+}
+
+# Apply to every regime
+_CROSS_INDICATOR_RULES = (
+    (lambda f: f.adx > 25 and f.macd_result == 4, "Trend present but MACD unclear - momentum conflict"),
+    (lambda f: f.rsi > 80, "RSI extremely overbought (>80)"),
+    (lambda f: f.rsi < 20, "RSI extremely oversold (<20)"),
+    (lambda f: f.vix > 35, "VIX very high (>35) - extreme uncertainty"),
+)
+
+
+# Packed per-symbol indicators for batch classification (NaN = missing)
+INDICATOR_DTYPE = np.dtype([
+    ("vix", "f8"),
+    ("adx", "f8"),
+    ("bandwidth", "f8"),
+    ("macd_code", "i1"),  # macd_result 0-4, -1 = missing
+    ("pp_code", "i1"),    # _PRICE_POSITION_CODES
+    ("obv_code", "i1"),   # _OBV_TREND_CODES
+    ("liq_code", "i1"),   # _LIQUIDITY_CODES
+])
+
+# Categorical indicator codes, 0 = missing/unknown
+_PRICE_POSITION_CODES = {"above": 1, "below": 2}
+_OBV_TREND_CODES = {"bullish": 1, "bearish": 2, "neutral": 3}
+_LIQUIDITY_CODES = {"low": 1, "normal": 2, "high": 3}
+
+
+def _indicator(data: dict, key: str, default: float) -> float:
+    """Read a numeric indicator, using default when it is missing.
+
+    NaN (too little history) and None (NaN after a JSON cache round-trip)
+    both count as missing, so fresh and cached data classify the same way.
+    """
+    value = data.get(key)
+    if value is None or value != value:
+        return default
+    return value
+
+
+def indicator_records(market_data: dict) -> np.ndarray:
+    """Pack per-symbol market data into an INDICATOR_DTYPE array.
+
+    Args:
+        market_data (dict): {symbol: data} as returned by get_market_data()
+
+    Returns:
+        np.ndarray: One record per symbol, in market_data order.
+    """
+    records = np.empty(len(market_data), dtype=INDICATOR_DTYPE)
+    for i, data in enumerate(market_data.values()):
+        macd_result = data.get("macd_result")
+        records[i] = (
+            np.nan if data.get("vix") is None else data["vix"],
+            np.nan if data.get("adx") is None else data["adx"],
+            (data.get("bollinger_bands") or {}).get("bandwidth", np.nan),
+            -1 if macd_result is None else macd_result,
+            _PRICE_POSITION_CODES.get((data.get("ma") or {}).get("price_position"), 0),
+            _OBV_TREND_CODES.get(data.get("obv_trend"), 0),
+            _LIQUIDITY_CODES.get((data.get("volume") or {}).get("liquidity"), 0),
+        )
+    return records
+
+
 class RegimeGuardian:
 
-    def __post_init__(self):
-        self.cache = cache_manager.CacheManager()
-        self.mc = market_calculator.MarketCalculator()
+    __slots__ = ("cache", "market_cache", "mc")
+
+    def __init__(self, cache: cache_manager.CacheManager = None, mc: market_calculator.MarketCalculator = None):
+        self.cache = cache or cache_manager.CacheManager()
+        self.market_cache = cache_manager.SharedMarketCache(self.cache)
+        self.mc = mc or market_calculator.MarketCalculator()
 
-    def get_market_data(self, symbol: str, ttl: int = 120) -> dict:
+    def get_market_data(self, symbol: str, ttl: int = None) -> dict:
         """Fetch market data with caching.
 
         Args:
             symbol: Stock symbol
-            ttl: Cache time-to-live in seconds (default: 2 minutes)
+            ttl: Cache time-to-live in seconds (default: settings.ttl_for("market"))
 
         Returns:
             Market data dictionary
         """
-        cache_key = f"market:{symbol}"
-        return self.cache.get_or_set(
-            cache_key,
+        return self.market_cache.get_or_set(
+            symbol,
             lambda: self.mc.fetch_market(symbol),
-            ttl=ttl
+            ttl=ttl or settings.ttl_for("market")
         )
 
+    async def get_market_data_async(self, symbol: str, ttl: int = None) -> dict:
+        """Async variant of get_market_data.
+
+        Args:
+            symbol: Stock symbol
+            ttl: Cache time-to-live in seconds (default: settings.ttl_for("market"))
+
+        Returns:
+            Market data dictionary
+        """
+        results = await self.get_market_data_many([symbol], ttl=ttl)
+        return results[symbol]
+
+    async def get_market_data_many(self, symbols: list, ttl: int = None) -> dict:
+        """Fetch market data for many symbols concurrently.
+
+        All cache lookups go out as a single MGET; only the misses are
+        computed, at most settings.MARKET_FETCH_CONCURRENCY at a time, under
+        the same recompute lock and stale copy as the sync get_or_set.
+
+        Args:
+            symbols: Stock symbols
+            ttl: Cache time-to-live in seconds (default: settings.ttl_for("market"))
+
+        Returns:
+            {symbol: market data dictionary}
+        """
+        keys = [self.market_cache.key(symbol) for symbol in symbols]
+        cached = await self.cache.amget(keys) if keys else []
+        results = dict(zip(symbols, cached))
+        ttl = ttl or settings.ttl_for("market")
+
+        semaphore = asyncio.Semaphore(settings.MARKET_FETCH_CONCURRENCY)
+
+        async def compute(symbol: str) -> dict:
+            async with semaphore:
+                return await asyncio.to_thread(self.mc.fetch_market, symbol)
+
+        async def fetch(symbol: str, key: str) -> None:
+            results[symbol] = await self.cache.aget_or_set(key, lambda: compute(symbol), ttl=ttl)
+
+        await asyncio.gather(*(
+            fetch(symbol, key)
+            for symbol, key in zip(symbols, keys)
+            if results[symbol] is None
+        ))
+        return results
+
     def classify_regime(self, symbol) -> str:
+        """Classify the market regime, cached alongside the market data.
+
+        Args:
+            symbol (str): Stock symbol to analyze
+
+        Returns:
+            str: The classified market regime.
+        """
+        return self.market_cache.get_or_set_regime(
+            symbol,
+            lambda: self._classify_impl(symbol),
+            ttl=settings.ttl_for("market")
+        )
+
+    def _classify_impl(self, symbol) -> str:
         """Classify the market regime based on the provided data.
 
         CONDITIONS:
@@ -64,61 +244,122 @@ class RegimeGuardian:
         data = self.get_market_data(symbol)
         
         # Extract indicators
-        vix = data.get("vix", 0)
-        adx = data.get("adx", 0)
+        vix = _indicator(data, "vix", 0)
+        adx = _indicator(data, "adx", 0)
         macd_result = data.get("macd_result")  # 0: strong bullish, 1: bullish, 2: strong bearish, 3: bearish, 4: no signal
-        ma = data.get("ma", {})
+        ma = data.get("ma") or {}
         price_position = ma.get("price_position")  # "above" or "below"
         obv_trend = data.get("obv_trend")  # "bullish", "bearish", "neutral"
-        bollinger = data.get("bollinger_bands", {})
-        bandwidth = bollinger.get("bandwidth", 100)
-        volume_data = data.get("volume", {})
+        bollinger = data.get("bollinger_bands") or {}
+        bandwidth = _indicator(bollinger, "bandwidth", 100)
+        volume_data = data.get("volume") or {}
         
         # 1. Check VOLATILITY_SPIKE first (highest priority)
         if vix > 30:
-            regime = "VOLATILITY_SPIKE"
+            regime = _VOLATILITY_SPIKE
             return regime
         
         # 2. Check LOW_LIQUIDITY
         if volume_data.get("liquidity") == "low":
-            regime = "LOW_LIQUIDITY"
+            regime = _LOW_LIQUIDITY
             return regime
         
         # 3. Check for trends (ADX > 25)
         if adx > 25:
             # Check bullish alignment
-            bullish_macd = macd_result in [0, 1]  # strong bullish or bullish
+            bullish_macd = macd_result in _BULL_MACD
             bullish_ma = price_position == "above"
             bullish_obv = obv_trend == "bullish"
             
             if bullish_macd and bullish_ma and bullish_obv:
-                regime = "BULL_TREND"
+                regime = _BULL_TREND
                 return regime
             
             # Check bearish alignment
-            bearish_macd = macd_result in [2, 3]  # strong bearish or bearish
+            bearish_macd = macd_result in _BEAR_MACD
             bearish_ma = price_position == "below"
             bearish_obv = obv_trend == "bearish"
             
             if bearish_macd and bearish_ma and bearish_obv:
-                regime = "BEAR_TREND"
+                regime = _BEAR_TREND
                 return regime
             
             # Trend exists but indicators don't align (conflicting signals)
-            regime = "RANGE_BOUND"
+            regime = _RANGE_BOUND
             return regime
         
         # 4. Check STAGNATION (very weak trend + narrow bands)
         if adx < 15 and bandwidth < 0.05:
-            regime = "STAGNATION"
+            regime = _STAGNATION
             return regime
         
         # 5. Default to RANGE_BOUND
-        regime = "RANGE_BOUND"
+        regime = _RANGE_BOUND
         return regime
 
 
 
+    def classify_regime_batch(self, records: np.ndarray) -> np.ndarray:
+        """Classify many symbols at once with vectorized boolean masks.
+
+        Same priority order, thresholds and defaults as classify_regime,
+        evaluated on whole columns instead of one symbol at a time.
+
+        Args:
+            records (np.ndarray): INDICATOR_DTYPE array, as built by indicator_records()
+
+        Returns:
+            np.ndarray: The classified market regime per record.
+        """
+        vix = np.nan_to_num(records["vix"], nan=0.0)
+        adx = np.nan_to_num(records["adx"], nan=0.0)
+        bandwidth = np.nan_to_num(records["bandwidth"], nan=100.0)
+        macd_code = records["macd_code"]
+        pp_code = records["pp_code"]
+        obv_code = records["obv_code"]
+
+        trend = adx > 25
+        bullish = (
+            np.isin(macd_code, list(_BULL_MACD))
+            & (pp_code == _PRICE_POSITION_CODES["above"])
+            & (obv_code == _OBV_TREND_CODES["bullish"])
+        )
+        bearish = (
+            np.isin(macd_code, list(_BEAR_MACD))
+            & (pp_code == _PRICE_POSITION_CODES["below"])
+            & (obv_code == _OBV_TREND_CODES["bearish"])
+        )
+
+        conditions = [
+            vix > 30,
+            records["liq_code"] == _LIQUIDITY_CODES["low"],
+            trend & bullish,
+            trend & bearish,
+            trend,
+            (adx < 15) & (bandwidth < 0.05),
+        ]
+        choices = [
+            _VOLATILITY_SPIKE,
+            _LOW_LIQUIDITY,
+            _BULL_TREND,
+            _BEAR_TREND,
+            _RANGE_BOUND,
+            _STAGNATION,
+        ]
+        return np.select(conditions, choices, default=_RANGE_BOUND)
+
+    def classify_regimes(self, market_data: dict) -> dict:
+        """Classify a batch of already-fetched market data.
+
+        Args:
+            market_data (dict): {symbol: data} as returned by get_market_data()
+
+        Returns:
+            dict: {symbol: regime}
+        """
+        regimes = self.classify_regime_batch(indicator_records(market_data))
+        return dict(zip(market_data, regimes.tolist()))
+
     def should_veto(self, symbol: str, regime: str, data: dict) -> tuple:
         """
         Determine if trade should be vetoed despite favorable regime
@@ -134,98 +375,34 @@ class RegimeGuardian:
                 - reason: Explanation for veto (or None if no veto)
                 - severity: "CRITICAL", "HIGH", "MEDIUM" (or None if no veto)
         """
-        veto_reasons = []
-                
-        # Extract indicators
-        rsi = data.get("rsi", 50)
-        obv_divergence = data.get("obv_divergence")
-        volume_data = data.get("volume", {})
-        volume_liquidity = volume_data.get("liquidity")
-        bollinger = data.get("bollinger_bands", {})
-        bollinger_position = bollinger.get("position")
-        vix = data.get("vix", 15)
-        adx = data.get("adx", 0)
-        macd_result = data.get("macd_result")
-        
-        # ========================================
+        # Extract indicators once; rules read them as attributes
+        volume_data = data.get("volume") or {}
+        bollinger = data.get("bollinger_bands") or {}
+        facts = SimpleNamespace(
+            regime=regime,
+            rsi=_indicator(data, "rsi", 50),
+            obv_divergence=data.get("obv_divergence"),
+            volume_liquidity=volume_data.get("liquidity"),
+            bollinger_position=bollinger.get("position"),
+            bandwidth=_indicator(bollinger, "bandwidth", 1.0),
+            vix=_indicator(data, "vix", 15),
+            adx=_indicator(data, "adx", 0),
+            macd_result=data.get("macd_result"),
+        )
+
         # CRITICAL VETOS (Always block trade)
-        # ========================================
-        
-        if regime == "VOLATILITY_SPIKE":
-            return (True, "Market volatility too high (VIX > 30)", "CRITICAL")
-        
-        if regime == "LOW_LIQUIDITY":
-            return (True, "Insufficient market liquidity", "CRITICAL")
-        
-        if volume_liquidity == "low":
-            return (True, "Low trading volume detected", "CRITICAL")
-        
-        # ========================================
-        # HIGH PRIORITY VETOS (Regime-specific)
-        # ========================================
-        
-        if regime == "BULL_TREND":
-            if rsi > 75:
-                veto_reasons.append("Severely overbought (RSI > 75)")
-            
-            if obv_divergence == "bearish":
-                veto_reasons.append("Bearish volume divergence - smart money exiting")
-            
-            if bollinger_position in ["far_above", "above_upper"]:
-                veto_reasons.append("Price overextended above Bollinger upper band")
-            
-            if vix > 25:
-                veto_reasons.append("VIX elevated despite bullish setup")
-        
-        elif regime == "BEAR_TREND":
-            if rsi < 25:
-                veto_reasons.append("Severely oversold (RSI < 25)")
-            
-            if obv_divergence == "bullish":
-                veto_reasons.append("Bullish volume divergence - smart money accumulating")
-            
-            if bollinger_position in ["far_below", "below_lower"]:
-                veto_reasons.append("Price overextended below Bollinger lower band")
-            
-            if vix > 40:
-                veto_reasons.append("VIX extremely high - panic selling, reversal risk")
-        
-        elif regime == "RANGE_BOUND":
-            if volume_liquidity == "low":
-                veto_reasons.append("Low volume in range - false breakout risk")
-            
-            if adx > 20 and adx < 25:
-                veto_reasons.append("ADX rising - range may be breaking soon")
-            
-            bandwidth = bollinger.get("bandwidth", 1.0)
-            if bandwidth < 0.05:
-                veto_reasons.append("Bollinger bands extremely narrow - breakout imminent")
-        
-        elif regime == "STAGNATION":
-            veto_reasons.append("Market stagnant - low profit opportunity")
-        
-        # ========================================
-        # MEDIUM PRIORITY VETOS (Cross-indicator conflicts)
-        # ========================================
-        
-        # Strong trend but MACD shows no signal
-        if adx > 25 and macd_result == 4:
-            veto_reasons.append("Trend present but MACD unclear - momentum conflict")
-        
-        # RSI extreme readings
-        if rsi > 80:
-            veto_reasons.append("RSI extremely overbought (>80)")
-        elif rsi < 20:
-            veto_reasons.append("RSI extremely oversold (<20)")
-        
-        # VIX warning for any regime
-        if vix > 35:
-            veto_reasons.append("VIX very high (>35) - extreme uncertainty")
-        
-        # ========================================
-        # RETURN VETO DECISION
-        # ========================================
-        
+        for predicate, reason in _CRITICAL_RULES:
+            if predicate(facts):
+                return (True, reason, "CRITICAL")
+
+        # HIGH PRIORITY (regime-specific) then MEDIUM PRIORITY (cross-indicator) vetos
+        veto_reasons = [
+            reason
+            for rules in (_REGIME_RULES.get(regime, ()), _CROSS_INDICATOR_RULES)
+            for predicate, reason in rules
+            if predicate(facts)
+        ]
+
         if veto_reasons:
             severity = "HIGH" if len(veto_reasons) > 1 else "MEDIUM"
             reason = "; ".join(veto_reasons)
@@ -235,9 +412,6 @@ class RegimeGuardian:
         return (False, None, None)
 
 
-
-
-
 if __name__ == "__main__":
     import json
 
@@ -249,12 +423,18 @@ if __name__ == "__main__":
     cache = rg.cache
 
     # Show all cached market keys
-    keys = cache.client.keys("market:*")
+    keys = [key.decode() for key in cache.client.scan_iter(match=f"{cache_manager.SHARED_MARKET_PREFIX}*", count=500)]
     print(f"Cached keys: {keys}")
 
+    # Fetch TTL + value for every key in a single round-trip
+    pipe = cache.client.pipeline(transaction=False)
     for key in keys:
-        ttl = cache.get_ttl(key)
-        data = cache.get(key)
+        pipe.ttl(key)
+        pipe.get(key)
+    results = pipe.execute() if keys else []
+
+    for key, ttl, raw in zip(keys, results[::2], results[1::2]):
+        data = cache.deserialize(raw)
         print(f"\n{key} (TTL: {ttl}s):")
         print(json.dumps(data, indent=2, default=str))
 
@@ -0,0 +1,93 @@
+"""Single-pass indicator kernels, JIT-compiled with Numba when it is installed.
+
+Numba is optional. Without it the kernels still import and run as plain
+Python (used by the tests), but MarketCalculator only calls them when
+HAVE_NUMBA is true and otherwise keeps its vectorized NumPy path.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that returns the function unchanged."""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True, fastmath=True)
+def obv_kernel(close, volume):
+    """On-Balance Volume: running sum of volume signed by price direction."""
+    n = close.size
+    out = np.empty(n)
+    if n == 0:
+        return out
+    acc = 0.0
+    out[0] = 0.0
+    for i in range(1, n):
+        d = close[i] - close[i - 1]
+        if d > 0:
+            acc += volume[i]
+        elif d < 0:
+            acc -= volume[i]
+        out[i] = acc
+    return out
+
+
+@njit(cache=True, fastmath=True)
+def rsi_wilder(close, period):
+    """Wilder-smoothed average gain and loss of close-to-close changes.
+
+    Matches pandas ewm(alpha=1/period, adjust=False) seeded with the first change.
+    """
+    alpha = 1.0 / period
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, close.size):
+        d = close[i] - close[i - 1]
+        gain = d if d > 0 else 0.0
+        loss = -d if d < 0 else 0.0
+        if i == 1:
+            avg_gain = gain
+            avg_loss = loss
+        else:
+            avg_gain += alpha * (gain - avg_gain)
+            avg_loss += alpha * (loss - avg_loss)
+    return avg_gain, avg_loss
+
+
+@njit(cache=True, fastmath=True)
+def adx_wilder(high, low, close, period):
+    """ADX with Wilder smoothing of ATR, +DM/-DM and DX in one pass."""
+    alpha = 1.0 / period
+    atr = 0.0
+    plus = 0.0
+    minus = 0.0
+    adx = 0.0
+    for i in range(close.size):
+        prev_close = close[i - 1] if i > 0 else close[0]
+        tr = max(high[i] - low[i], abs(high[i] - prev_close), abs(low[i] - prev_close))
+        up = high[i] - high[i - 1] if i > 0 else 0.0
+        down = low[i - 1] - low[i] if i > 0 else 0.0
+        plus_dm = up if up > down and up > 0 else 0.0
+        minus_dm = down if down > up and down > 0 else 0.0
+
+        if i == 0:
+            atr, plus, minus = tr, plus_dm, minus_dm
+        else:
+            atr += alpha * (tr - atr)
+            plus += alpha * (plus_dm - plus)
+            minus += alpha * (minus_dm - minus)
+
+        dx = 0.0
+        if atr > 0:
+            plus_di = 100.0 * plus / atr
+            minus_di = 100.0 * minus / atr
+            if plus_di + minus_di > 0:
+                dx = 100.0 * abs(plus_di - minus_di) / (plus_di + minus_di)
+        adx = dx if i == 0 else adx + alpha * (dx - adx)
+    return adx
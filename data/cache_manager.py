@@ -1,13 +1,53 @@
 import os
-import json
-from typing import Any
-
+import time
+import asyncio
+import fnmatch
+import secrets
+import threading
+import weakref
+from typing import Any, Callable
+
+import orjson
 import redis 
+import redis.asyncio
 from dotenv import load_dotenv
 
 load_dotenv()
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_UNIX_SOCKET = os.getenv("REDIS_UNIX_SOCKET")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "32"))
+
+# In-process L1 settings: entries live at most this long before Redis is asked again
+L1_TTL = 5.0
+L1_MAX_ENTRIES = 1024
+
+# Leading byte on every payload so future serialization changes are detectable
+PAYLOAD_VERSION = b'\x01'
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+
+# Stampede protection: recompute lock lifetime and how long stale copies outlive the key
+LOCK_TTL = 30
+STALE_TTL_FACTOR = 10
+STALE_PREFIX = "stale:"
+# Release a recompute lock only if it still holds our token; once LOCK_TTL has
+# passed the key may belong to another recomputer
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Market data is identical for every caller, so it lives in one shared namespace
+SHARED_MARKET_PREFIX = "shared:market:"
+SHARED_REGIME_PREFIX = "shared:regime:"
+
+# Hit/miss counters are shared across workers in this hash, flushed in batches
+STATS_KEY = "cache:stats"
+STATS_FLUSH_EVERY = 100
+# Key-level invalidations so other processes drop their L1 copies
+INVALIDATE_CHANNEL = "cache:invalidate"
 
 
 class CacheManager:
@@ -15,7 +55,12 @@ class CacheManager:
 
     _instance = None
     _client: redis.Redis | None = None
+    _async_clients: weakref.WeakKeyDictionary | None = None
+    _pool_args: tuple = (None, None, None)
     _stats: dict | None = None
+    _stats_lock: threading.Lock = threading.Lock()
+    _l1: dict[str, tuple[float, Any]] | None = None
+    _l1_lock: threading.Lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -24,18 +69,58 @@ class CacheManager:
 
     def __init__(self, host: str = None, port: int = None, db: int = None):
         if self._client is None:
-            if host and port:
-                self._client = redis.Redis(host=host, port=port, db=db or 0, decode_responses=True)
-            else:
-                self._client = redis.from_url(REDIS_URL, decode_responses=True)
+            self._pool_args = (host, port, db)
+            self._client = redis.Redis(connection_pool=self._build_pool(host, port, db))
+        if self._async_clients is None:
+            self._async_clients = weakref.WeakKeyDictionary()
         if self._stats is None:
             self._stats = {'hits': 0, 'misses': 0}
+        if self._l1 is None:
+            self._l1 = {}
+
+    @staticmethod
+    def _build_pool(host: str = None, port: int = None, db: int = None, backend=redis) -> redis.ConnectionPool:
+        """Build the process-wide connection pool.
+
+        Prefers a UNIX domain socket (REDIS_UNIX_SOCKET) for a colocated Redis,
+        then explicit host/port, then REDIS_URL. The hiredis parser is picked
+        up automatically when installed.
+
+        Args:
+            backend: redis or redis.asyncio, so both clients share one configuration
+        """
+        options = {'max_connections': REDIS_MAX_CONNECTIONS, 'health_check_interval': 30}
+        if REDIS_UNIX_SOCKET:
+            return backend.ConnectionPool(
+                connection_class=backend.UnixDomainSocketConnection,
+                path=REDIS_UNIX_SOCKET,
+                db=db or 0,
+                **options
+            )
+        if host and port:
+            return backend.ConnectionPool(host=host, port=port, db=db or 0, socket_keepalive=True, **options)
+        return backend.ConnectionPool.from_url(REDIS_URL, socket_keepalive=True, **options)
 
     @property
     def client(self) -> redis.Redis:
         """Get the Redis client."""
         return self._client
 
+    @property
+    def async_client(self) -> redis.asyncio.Redis:
+        """Get the asyncio Redis client for the running event loop.
+
+        asyncio connections are bound to the loop that opened them, so each
+        loop (e.g. every asyncio.run call) gets its own client and pool.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            pool = self._build_pool(*self._pool_args, backend=redis.asyncio)
+            client = redis.asyncio.Redis(connection_pool=pool)
+            self._async_clients[loop] = client
+        return client
+
     def get(self, key: str) -> Any | None:
         """Get a value from cache.
 
@@ -45,15 +130,82 @@ class CacheManager:
         Returns:
             Cached value or None if not found/expired
         """
+        with self._l1_lock:
+            entry = self._l1.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._record('hits')
+            return entry[1]
+
         value = self._client.get(key)
         if value is None:
-            self._stats['misses'] += 1
+            self._record('misses')
             return None
-        self._stats['hits'] += 1
-        try:
-            return json.loads(value)
-        except json.JSONDecodeError:
-            return value
+        self._record('hits')
+        decoded = self.deserialize(value)
+        self._l1_store(key, decoded)
+        return decoded
+
+    def mget(self, keys: list[str]) -> list[Any | None]:
+        """Get many values in a single round-trip.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Cached values (None for missing keys), in the order of keys
+        """
+        results = [None] * len(keys)
+        missing = []
+        now = time.monotonic()
+        with self._l1_lock:
+            for i, key in enumerate(keys):
+                entry = self._l1.get(key)
+                if entry is not None and entry[0] > now:
+                    results[i] = entry[1]
+                else:
+                    missing.append(i)
+
+        if missing:
+            raw_values = self._client.mget([keys[i] for i in missing])
+            for i, raw in zip(missing, raw_values):
+                if raw is not None:
+                    results[i] = self.deserialize(raw)
+                    self._l1_store(keys[i], results[i])
+
+        for value in results:
+            self._record('hits' if value is not None else 'misses')
+        return results
+
+    async def amget(self, keys: list[str]) -> list[Any | None]:
+        """Async mget(): L1 first, then a single MGET for the rest.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Cached values (None for missing keys), in the order of keys
+        """
+        results = [None] * len(keys)
+        missing = []
+        now = time.monotonic()
+        with self._l1_lock:
+            for i, key in enumerate(keys):
+                entry = self._l1.get(key)
+                if entry is not None and entry[0] > now:
+                    results[i] = entry[1]
+                else:
+                    missing.append(i)
+
+        if missing:
+            raw_values = await self.async_client.mget([keys[i] for i in missing])
+            for i, raw in zip(missing, raw_values):
+                if raw is not None:
+                    results[i] = self.deserialize(raw)
+                    self._l1_store(keys[i], results[i])
+
+        for value in results:
+            self._record('hits' if value is not None else 'misses')
+        return results
 
     def set(self, key: str, value: Any, ttl: int = 300) -> bool:
         """Set a value in cache with expiration.
@@ -66,7 +218,11 @@ class CacheManager:
         Returns:
             True if successful
         """
-        serialized = json.dumps(value) if not isinstance(value, str) else value
+        serialized = self.serialize(value)
+        # Write-through: the next local read skips Redis, never outliving the Redis TTL.
+        # L1 gets the decoded payload, not the caller's object, so later mutation
+        # by the caller cannot leak into cached reads
+        self._l1_store(key, self.deserialize(serialized), ttl)
         return self._client.setex(key, ttl, serialized)
 
     def delete(self, key: str) -> bool:
@@ -78,8 +234,39 @@ class CacheManager:
         Returns:
             True if key was deleted
         """
+        self._l1_invalidate(key)
         return bool(self._client.delete(key))
 
+    def invalidate(self, *keys: str) -> None:
+        """Delete keys and tell other processes to drop their L1 copies.
+
+        Args:
+            keys: Cache keys to invalidate
+        """
+        if not keys:
+            return
+        self._l1_invalidate(*keys)
+        pipe = self._client.pipeline(transaction=False)
+        # Stale copies go too, so a timed-out waiter can't be served invalidated data
+        pipe.delete(*keys, *(f"{STALE_PREFIX}{key}" for key in keys))
+        for key in keys:
+            pipe.publish(INVALIDATE_CHANNEL, key)
+        pipe.execute()
+
+    def listen(self):
+        """Start a daemon thread that applies key invalidations from other processes.
+
+        Returns:
+            The redis-py PubSubWorkerThread (call .stop() to end it)
+        """
+        def on_invalidate(message: dict) -> None:
+            key = message['data']
+            self._l1_invalidate(key.decode() if isinstance(key, bytes) else key)
+
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{INVALIDATE_CHANNEL: on_invalidate})
+        return pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
     def exists(self, key: str) -> bool:
         """Check if a key exists in cache.
 
@@ -103,26 +290,44 @@ class CacheManager:
         return self._client.ttl(key)
 
     def clear_pattern(self, pattern: str) -> int:
-        """Delete all keys matching a pattern.
+        """Delete all keys matching a pattern, with their stale copies, everywhere.
 
         Args:
             pattern: Redis glob pattern (e.g., "price:*")
 
         Returns:
-            Number of keys deleted
+            Number of keys deleted (stale copies not counted)
         """
-        keys = self._client.keys(pattern)
+        with self._l1_lock:
+            for key in fnmatch.filter(list(self._l1), pattern):
+                self._l1.pop(key, None)
+        keys = list(self._client.scan_iter(match=pattern, count=500))
+        stale = list(self._client.scan_iter(match=f"{STALE_PREFIX}{pattern}", count=500))
+        if not keys and not stale:
+            return 0
+        pipe = self._client.pipeline(transaction=False)
         if keys:
-            return self._client.delete(*keys)
-        return 0
-
-    def get_or_set(self, key: str, factory: callable, ttl: int = 300) -> Any:
+            pipe.delete(*keys)
+        if stale:
+            pipe.delete(*stale)
+        for key in keys:
+            pipe.publish(INVALIDATE_CHANNEL, key)
+        results = pipe.execute()
+        return results[0] if keys else 0
+
+    def get_or_set(self, key: str, factory: callable, ttl: int | Callable[[], int] = 300, wait_timeout: float = 5.0) -> Any:
         """Get from cache or compute and cache the value.
 
+        Only one caller (across processes) recomputes a missing key; others
+        wait for its result and fall back to the last known value if it
+        does not show up within wait_timeout.
+
         Args:
             key: Cache key
             factory: Function to call if cache miss
-            ttl: TTL for cached value
+            ttl: TTL for cached value, or a function returning it once the
+                value has been computed
+            wait_timeout: Seconds to wait for another caller's recompute
 
         Returns:
             Cached or computed value
@@ -131,22 +336,176 @@ class CacheManager:
         if value is not None:
             return value
 
+        lock_key = f"lock:{key}"
+        token = secrets.token_hex(16)
+        if self._client.set(lock_key, token, nx=True, ex=LOCK_TTL):
+            try:
+                return self._compute_and_store(key, factory, ttl)
+            finally:
+                self._client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+        # Someone else is recomputing - poll with exponential backoff
+        delay = 0.01
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            value = self.deserialize(self._client.get(key))
+            if value is not None:
+                self._l1_store(key, value)
+                return value
+            delay = min(delay * 2, 0.2)
+
+        stale = self.deserialize(self._client.get(f"{STALE_PREFIX}{key}"))
+        if stale is not None:
+            return stale
+        return self._compute_and_store(key, factory, ttl)
+
+    async def aget_or_set(self, key: str, factory: callable, ttl: int | Callable[[], int] = 300,
+                          wait_timeout: float = 5.0) -> Any:
+        """Async get_or_set() with the same lock and stale-copy protection.
+
+        Args:
+            key: Cache key
+            factory: Coroutine function to await if cache miss
+            ttl: TTL for cached value, or a function returning it once the
+                value has been computed
+            wait_timeout: Seconds to wait for another caller's recompute
+
+        Returns:
+            Cached or computed value
+        """
+        client = self.async_client
+        value = (await self.amget([key]))[0]
+        if value is not None:
+            return value
+
+        lock_key = f"lock:{key}"
+        token = secrets.token_hex(16)
+        if await client.set(lock_key, token, nx=True, ex=LOCK_TTL):
+            try:
+                return await self._acompute_and_store(key, factory, ttl)
+            finally:
+                await client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+        delay = 0.01
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            value = self.deserialize(await client.get(key))
+            if value is not None:
+                self._l1_store(key, value)
+                return value
+            delay = min(delay * 2, 0.2)
+
+        stale = self.deserialize(await client.get(f"{STALE_PREFIX}{key}"))
+        if stale is not None:
+            return stale
+        return await self._acompute_and_store(key, factory, ttl)
+
+    async def _acompute_and_store(self, key: str, factory: callable, ttl: int | Callable[[], int]) -> Any:
+        """Await factory and cache the result plus a long-lived stale copy."""
+        value = await factory()
+        if callable(ttl):
+            ttl = ttl()
+        serialized = self.serialize(value)
+        self._l1_store(key, self.deserialize(serialized), ttl)
+        pipe = self.async_client.pipeline(transaction=False)
+        pipe.setex(key, ttl, serialized)
+        pipe.setex(f"{STALE_PREFIX}{key}", ttl * STALE_TTL_FACTOR, serialized)
+        await pipe.execute()
+        return value
+
+    def _compute_and_store(self, key: str, factory: callable, ttl: int | Callable[[], int]) -> Any:
+        """Call factory and cache the result plus a long-lived stale copy."""
         value = factory()
+        if callable(ttl):
+            ttl = ttl()
         self.set(key, value, ttl)
+        self._client.setex(f"{STALE_PREFIX}{key}", ttl * STALE_TTL_FACTOR, self.serialize(value))
         return value
 
+    @staticmethod
+    def serialize(value: Any) -> bytes:
+        """Encode a value as a versioned orjson payload.
+
+        Args:
+            value: JSON-compatible value (NumPy scalars/arrays allowed)
+
+        Returns:
+            Bytes ready to be stored in Redis
+        """
+        return PAYLOAD_VERSION + orjson.dumps(value, option=ORJSON_OPTIONS)
+
+    @staticmethod
+    def deserialize(value: bytes | str | None) -> Any:
+        """Decode a raw Redis payload written by serialize().
+
+        Args:
+            value: Raw bytes from Redis
+
+        Returns:
+            Decoded value; unversioned payloads are parsed as plain JSON and
+            returned as text if that fails
+        """
+        if value is None:
+            return None
+        if isinstance(value, bytes) and value[:1] == PAYLOAD_VERSION:
+            return orjson.loads(value[1:])
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return value.decode() if isinstance(value, bytes) else value
+
+    def _l1_store(self, key: str, value: Any, ttl: float = L1_TTL) -> None:
+        """Remember a decoded Redis value in the in-process L1 cache."""
+        with self._l1_lock:
+            self._l1.pop(key, None)
+            self._l1[key] = (time.monotonic() + min(ttl, L1_TTL), value)
+            while len(self._l1) > L1_MAX_ENTRIES:
+                self._l1.pop(next(iter(self._l1)))
+
+    def _l1_invalidate(self, *keys: str) -> None:
+        """Drop keys from the in-process L1 cache."""
+        with self._l1_lock:
+            for key in keys:
+                self._l1.pop(key, None)
+
+    def _record(self, field: str) -> None:
+        """Count a hit or miss locally and flush to Redis every STATS_FLUSH_EVERY ops."""
+        with self._stats_lock:
+            self._stats[field] += 1
+            if sum(self._stats.values()) < STATS_FLUSH_EVERY:
+                return
+        self.flush_stats()
+
+    def flush_stats(self) -> None:
+        """Push locally buffered hit/miss counts to the shared Redis hash."""
+        with self._stats_lock:
+            pending = {field: count for field, count in self._stats.items() if count}
+            self._stats = {'hits': 0, 'misses': 0}
+        if not pending:
+            return
+        pipe = self._client.pipeline(transaction=False)
+        for field, count in pending.items():
+            pipe.hincrby(STATS_KEY, field, count)
+        pipe.execute()
+
     def get_stats(self) -> dict:
-        """Get cache statistics.
+        """Get cache statistics across all workers.
 
         Returns:
             Dictionary with hits, misses, hit_rate, and total_keys
         """
-        total = self._stats['hits'] + self._stats['misses']
-        hit_rate = self._stats['hits'] / total if total > 0 else 0.0
-        total_keys = len(self._client.keys('*'))
+        self.flush_stats()
+        stats = self._client.hgetall(STATS_KEY)
+        hits = int(stats.get(b'hits', 0))
+        misses = int(stats.get(b'misses', 0))
+        total = hits + misses
+        hit_rate = hits / total if total > 0 else 0.0
+        total_keys = self._client.dbsize()
         return {
-            'hits': self._stats['hits'],
-            'misses': self._stats['misses'],
+            'hits': hits,
+            'misses': misses,
             'hit_rate': hit_rate,
             'total_keys': total_keys
         }
@@ -163,6 +522,70 @@ class CacheManager:
             return False
 
 
+class SharedMarketCache:
+    """Facade over CacheManager for market data shared by all callers.
+
+    Keys are normalized to shared:market:{SYMBOL} so every tenant reads the
+    same entry; tenant-scoped data (e.g. user:{id}:portfolio) stays on the
+    plain CacheManager. Invalidations go through CacheManager.invalidate, so
+    the CacheManager.listen() thread drops other processes' L1 copies.
+    """
+
+    def __init__(self, cache: CacheManager = None):
+        self.cache = cache or CacheManager()
+
+    @staticmethod
+    def key(symbol: str) -> str:
+        """Get the shared cache key for a symbol."""
+        return f"{SHARED_MARKET_PREFIX}{symbol.strip().upper()}"
+
+    @staticmethod
+    def regime_key(symbol: str) -> str:
+        """Get the shared cache key for a symbol's classified regime."""
+        return f"{SHARED_REGIME_PREFIX}{symbol.strip().upper()}"
+
+    def get_or_set(self, symbol: str, factory: callable, ttl: int) -> Any:
+        """Get shared market data or compute and cache it.
+
+        Args:
+            symbol: Stock symbol
+            factory: Function to call if cache miss
+            ttl: TTL for cached value
+
+        Returns:
+            Cached or computed market data
+        """
+        return self.cache.get_or_set(self.key(symbol), factory, ttl=ttl)
+
+    def get_or_set_regime(self, symbol: str, factory: callable, ttl: int) -> str:
+        """Get a symbol's classified regime or compute and cache it.
+
+        The regime is stored with the market entry's remaining TTL, so it
+        expires no later than the data it was derived from.
+
+        Args:
+            symbol: Stock symbol
+            factory: Function to call if cache miss
+            ttl: Upper bound on the TTL, used when the market entry has none
+
+        Returns:
+            Cached or computed regime
+        """
+        def remaining_ttl() -> int:
+            remaining = self.cache.get_ttl(self.key(symbol))
+            return min(ttl, remaining) if remaining > 0 else ttl
+
+        return self.cache.get_or_set(self.regime_key(symbol), factory, ttl=remaining_ttl)
+
+    def invalidate(self, symbol: str) -> None:
+        """Drop a symbol's shared market data and derived regime everywhere.
+
+        Args:
+            symbol: Stock symbol
+        """
+        self.cache.invalidate(self.key(symbol), self.regime_key(symbol))
+
+
 # Lazy singleton - don't instantiate at import time
 def get_cache() -> CacheManager:
     """Get the singleton CacheManager instance."""
@@ -1,15 +1,31 @@
 import anthropic
+import asyncio
 import os
+import random
+import sys
 import finnhub
 import time
 import logging
-from typing import Dict, List, Callable, Any
-from collections import deque
+import math
+import threading
+import orjson
+import numpy as np
+from typing import Dict, Final, Iterator, List, Callable, Any
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 import yfinance as yf
+from curl_cffi import requests as curl_requests
+from websockets.asyncio.client import connect as ws_connect
+from websockets.exceptions import ConnectionClosed
+import requests
+from requests.adapters import HTTPAdapter
 
 from data.cache_manager import CacheManager
-from config.settings import CACHE_TTL, RATE_LIMIT_PER_MINUTE
+from config.settings import (
+    CACHE_TTL, HTTP_POOL_SIZE, MARKET_FETCH_CONCURRENCY, RATE_LIMIT_PER_MINUTE, RETRY_MAX_DELAY, XFETCH_BETA,
+    FINNHUB_WS_URL, YAHOO_CHART_URL, ttl_for,
+)
 
 
 # Load env variables
@@ -17,16 +33,79 @@ load_dotenv()
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")
 
+
+
+def mount_finnhub_pool(client: finnhub.Client, adapter: HTTPAdapter) -> bool:
+    """
+    Mount a sized connection pool on a Finnhub client's requests session.
+    finnhub-python has no public way to pass a session, so this uses its
+    private _session (present through the 2.4.x line pinned in
+    requirements.txt). If that ever changes, the client keeps working
+    unpooled and a warning is logged.
+
+    Returns:
+        True if the adapter was mounted
+    """
+    session = getattr(client, '_session', None)
+    if not isinstance(session, requests.Session):
+        logging.getLogger(__name__).warning("finnhub.Client has no requests session; Finnhub calls are not pooled")
+        return False
+    session.mount('https://', adapter)
+    return True
+
+
 anthropic_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
 finnhub_client = finnhub.Client(api_key=FINNHUB_API_KEY)
-
-llm_models = {
-    "claude-sonnet-4-5": "claude-sonnet-4-5",  # best model, for active mode
-    "claude-haiku-4-5": "claude-haiku-4-5",  # faster, cheaper, for passive mode
-    "claude-opus-4-5": "claude-opus-4-5",  # balanced, for general use
-    "ollama3.1:latest": "ollama3.1:latest"  # local model
+# Size the client's session pool for the get_all_data thread pool so
+# concurrent calls reuse warm TCP/TLS connections instead of reconnecting
+_http_adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+mount_finnhub_pool(finnhub_client, _http_adapter)
+# One warm HTTP/2 session per thread for Yahoo requests: yfinance Tickers and the
+# raw chart endpoint share its connections (browser TLS fingerprint, as yfinance
+# needs). curl_cffi sessions are not thread-safe, so threads never share one.
+_yahoo_local = threading.local()
+
+
+def yahoo_session() -> curl_requests.Session:
+    """Get the calling thread's Yahoo session (created on first use)."""
+    session = getattr(_yahoo_local, 'session', None)
+    if session is None:
+        session = _yahoo_local.session = curl_requests.Session(impersonate="chrome", timeout=10)
+    return session
+
+
+# Long-lived worker pools for batch fetches. Their threads outlive each batch,
+# so per-thread sessions keep their connections warm across calls
+fetch_executor = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="data-fetch")
+market_executor = ThreadPoolExecutor(max_workers=MARKET_FETCH_CONCURRENCY, thread_name_prefix="market-fetch")
+
+
+# Best model, for active mode (claude-haiku-4-5 is faster and cheaper for passive mode)
+DEFAULT_LLM_MODEL: Final[str] = "claude-sonnet-4-5"
+SYSTEM_PROMPT: Final[str] = (
+    "You are a data fetcher bot that provides concise and accurate information. "
+    "For understanding of other roles, build context but do not respond as them."
+)
+
+# Cache key templates for the per-symbol endpoints
+CACHE_KEYS = {
+    'quote': "finnhub:quote:{symbol}",
+    'financials': "finnhub:financials:{symbol}",
+    'recommendations': "finnhub:recommendations:{symbol}",
+    'insiders': "finnhub:insiders:{symbol}:{from_date}:{to_date}",
+    'insider_sentiment': "finnhub:insider_sentiment:{symbol}:{from_date}:{to_date}",
+    'profile': "finnhub:profile:{symbol}",
+    'peers': "finnhub:peers:{symbol}",
+    'earnings': "finnhub:earnings:{symbol}:{from_date}:{to_date}",
+    'historical_30d': "finnhub:historical_30d:{symbol}",
 }
 
+# Endpoints keyed by symbol alone, i.e. the ones invalidate() can evict
+SYMBOL_CACHE_KEYS = ('quote', 'financials', 'recommendations', 'profile', 'peers')
+
+# XFetch bookkeeping is kept for at most this many keys (least recently written dropped first)
+XFETCH_MAX_KEYS = 4096
+
 # TODO: Add later on with the time zone definer class, in which mode we are operating!
 
 
@@ -50,7 +129,20 @@ class DataProvider:
 
         # Rate limiting
         self.requests_per_minute = requests_per_minute
-        self.api_call_times: deque = deque(maxlen=self.requests_per_minute)
+        self._rate_limit_lock = threading.Lock()
+        self._tokens = float(self.requests_per_minute)
+        self._last_refill = time.monotonic()
+
+        # Single-flight: one in-progress fetch per cache key
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+        # XFetch: (expires_at, fetch_seconds) for the keys this process wrote
+        self._xfetch: OrderedDict[str, tuple] = OrderedDict()
+        self._xfetch_lock = threading.Lock()
+
+        # Trade stream: when each symbol's quote was last evicted (monotonic seconds)
+        self._quote_evicted_at: Dict[str, float] = {}
 
         # Cache TTL configuration
         self.cache_ttl = CACHE_TTL
@@ -60,41 +152,35 @@ class DataProvider:
             'api_calls': 0,
             'cache_hits': 0,
             'cache_misses': 0,
-            'errors': {},
+            'errors': Counter(),
             'rate_limit_waits': 0
         }
+        # Counters are bumped from worker threads; += on a dict entry is not atomic
+        self._stats_lock = threading.Lock()
 
     #######################################
-    ###### Always fresh data methods ######
+    ###### ~10 second cache ##############
     #######################################
 
     def get_price(self, symbol: str) -> Dict:
-        """Get full price quote. NO CACHE - always fresh."""
+        """Get full price quote. CACHE ~10 SECONDS."""
         symbol = self._validate_symbol(symbol)
         self.logger.info(f"Fetching price for {symbol}")
+        cache_key = CACHE_KEYS['quote'].format(symbol=symbol)
 
-        self._check_rate_limit()
-        try:
-            quote = self.finnhub_client.quote(symbol)
-            self.stats['api_calls'] += 1
-            return quote
-        except Exception as e:
-            self._handle_api_error(e, 'quote', symbol)
-            raise
+        return self._fetch_with_cache(
+            cache_key,
+            lambda: self.finnhub_client.quote(symbol),
+            ttl=ttl_for('quote')
+        )
 
     def get_current_price(self, symbol: str) -> float:
-        """Get current price only. NO CACHE - always fresh."""
-        symbol = self._validate_symbol(symbol)
-        self.logger.info(f"Fetching current price for {symbol}")
+        """Get current price only. CACHE ~10 SECONDS (shares the quote key)."""
+        return self.get_price(symbol)["c"]
 
-        self._check_rate_limit()
-        try:
-            quote = self.finnhub_client.quote(symbol)
-            self.stats['api_calls'] += 1
-            return quote["c"]
-        except Exception as e:
-            self._handle_api_error(e, 'current_price', symbol)
-            raise
+    #######################################
+    ###### Always fresh data methods ######
+    #######################################
 
     def fetch_company_news(self, symbol: str, from_date: str, to_date: str) -> List[Dict]:
         """Get company news. NO CACHE - always fresh."""
@@ -104,12 +190,46 @@ class DataProvider:
         self._check_rate_limit()
         try:
             news = self.finnhub_client.company_news(symbol, _from=from_date, to=to_date)
-            self.stats['api_calls'] += 1
+            self._count('api_calls')
             return news
         except Exception as e:
             self._handle_api_error(e, 'news', symbol)
             raise
 
+    def raw_history(self, symbol: str, range_: str = "1y", interval: str = "1d") -> Dict[str, np.ndarray]:
+        """Get daily bars straight from Yahoo's v8 chart JSON. NO CACHE.
+
+        Skips yfinance's DataFrame construction, timezone localization and
+        split/dividend handling; bars with no close are dropped like yfinance does.
+
+        Args:
+            symbol: Stock symbol
+            range_: Yahoo range (e.g. "1y")
+            interval: Bar interval
+
+        Returns:
+            Dictionary of float64 arrays: timestamp, open, high, low, close, volume
+        """
+        symbol = self._validate_symbol(symbol)
+        try:
+            response = yahoo_session().get(
+                YAHOO_CHART_URL.format(symbol=symbol),
+                params={'range': range_, 'interval': interval},
+            )
+            response.raise_for_status()
+            result = orjson.loads(response.content)['chart']['result'][0]
+        except Exception as e:
+            self._handle_api_error(e, 'chart', symbol)
+            raise
+
+        quote = result['indicators']['quote'][0]
+        # None entries (halted/missing bars) become NaN
+        bars = {'timestamp': np.asarray(result.get('timestamp', []), dtype=float)}
+        for field in ('open', 'high', 'low', 'close', 'volume'):
+            bars[field] = np.asarray(quote.get(field, []), dtype=float)
+        keep = ~np.isnan(bars['close'])
+        return {field: values[keep] for field, values in bars.items()}
+
     #######################################
     ###### 1 hour cache #################
     #######################################
@@ -125,7 +245,7 @@ class DataProvider:
     def get_basic_financials(self, symbol: str) -> Dict:
         """Get financial metrics (P/E, EPS, beta). CACHE 1 DAY."""
         symbol = self._validate_symbol(symbol)
-        cache_key = f"finnhub:financials:{symbol}"
+        cache_key = CACHE_KEYS['financials'].format(symbol=symbol)
 
         return self._fetch_with_cache(
             cache_key,
@@ -140,7 +260,7 @@ class DataProvider:
     def get_recommendations(self, symbol: str) -> List[Dict]:
         """Get analyst recommendations. CACHE 1 DAY."""
         symbol = self._validate_symbol(symbol)
-        cache_key = f"finnhub:recommendations:{symbol}"
+        cache_key = CACHE_KEYS['recommendations'].format(symbol=symbol)
 
         return self._fetch_with_cache(
             cache_key,
@@ -155,7 +275,7 @@ class DataProvider:
     def get_insider_transactions(self, symbol: str, from_date: str, to_date: str) -> List[Dict]:
         """Get insider transactions. CACHE 1 DAY."""
         symbol = self._validate_symbol(symbol)
-        cache_key = f"finnhub:insiders:{symbol}:{from_date}:{to_date}"
+        cache_key = CACHE_KEYS['insiders'].format(symbol=symbol, from_date=from_date, to_date=to_date)
 
         return self._fetch_with_cache(
             cache_key,
@@ -166,7 +286,7 @@ class DataProvider:
     def get_insider_sentiment(self, symbol: str, from_date: str, to_date: str) -> Dict:
         """Get insider sentiment. CACHE 1 DAY."""
         symbol = self._validate_symbol(symbol)
-        cache_key = f"finnhub:insider_sentiment:{symbol}:{from_date}:{to_date}"
+        cache_key = CACHE_KEYS['insider_sentiment'].format(symbol=symbol, from_date=from_date, to_date=to_date)
 
         return self._fetch_with_cache(
             cache_key,
@@ -178,9 +298,9 @@ class DataProvider:
         """Get earnings calendar. CACHE 1 DAY."""
         if symbol:
             symbol = self._validate_symbol(symbol)
-            cache_key = f"finnhub:earnings:{symbol}:{from_date}:{to_date}"
+            cache_key = CACHE_KEYS['earnings'].format(symbol=symbol, from_date=from_date, to_date=to_date)
         else:
-            cache_key = f"finnhub:earnings:all:{from_date}:{to_date}"
+            cache_key = CACHE_KEYS['earnings'].format(symbol='all', from_date=from_date, to_date=to_date)
 
         return self._fetch_with_cache(
             cache_key,
@@ -200,7 +320,7 @@ class DataProvider:
         """
         if symbol:
             symbol = self._validate_symbol(symbol)
-            cache_key = f"finnhub:historical_30d:{symbol}"
+            cache_key = CACHE_KEYS['historical_30d'].format(symbol=symbol)
         else:
             raise ValueError("Symbol must be provided for historical data.")
         
@@ -221,7 +341,7 @@ class DataProvider:
     def get_company_profile(self, symbol: str) -> Dict:
         """Get company profile. CACHE 1 WEEK."""
         symbol = self._validate_symbol(symbol)
-        cache_key = f"finnhub:profile:{symbol}"
+        cache_key = CACHE_KEYS['profile'].format(symbol=symbol)
 
         return self._fetch_with_cache(
             cache_key,
@@ -232,7 +352,7 @@ class DataProvider:
     def get_company_peers(self, symbol: str) -> List[str]:
         """Get company peers. CACHE 1 WEEK."""
         symbol = self._validate_symbol(symbol)
-        cache_key = f"finnhub:peers:{symbol}"
+        cache_key = CACHE_KEYS['peers'].format(symbol=symbol)
 
         return self._fetch_with_cache(
             cache_key,
@@ -244,19 +364,77 @@ class DataProvider:
     ###### ALL AT ONCE #################
     ###########################################
 
-    def get_all_data(self, symbol: str, from_date: str, to_date: str) -> Dict:
+    def get_all_data(self, symbol: str, from_date: str, to_date: str, as_bytes: bool = False) -> Dict | bytes:
         """
         Fetch all available data for a symbol.
+        Cached endpoints are read with a single MGET; only the misses are
+        fetched, concurrently on a thread pool.
         Handles errors gracefully - continues if one endpoint fails.
+
+        With as_bytes=True the result comes back as a compact versioned orjson
+        payload (CacheManager.serialize) for callers that push it to Redis or a
+        queue; read it back with CacheManager.deserialize.
         """
         symbol = self._validate_symbol(symbol)
-        self.logger.info(f"Fetching all data for {symbol}")
+        result = self.get_all_data_bulk([symbol], from_date, to_date)[symbol]
+        return CacheManager.serialize(result) if as_bytes else result
+
+    def get_all_data_bulk(self, symbols: List[str], from_date: str, to_date: str) -> Dict[str, Dict]:
+        """
+        Fetch all available data for many symbols in one batch.
+        Every symbol x endpoint cache key is read with a single MGET, and all
+        misses share the long-lived fetch_executor (sized to the HTTP
+        connection pool); the token bucket still bounds the overall request rate.
+        Handles errors gracefully - a failed endpoint comes back as None.
+
+        Args:
+            symbols: Stock symbols
+            from_date: Start date (YYYY-MM-DD)
+            to_date: End date (YYYY-MM-DD)
+
+        Returns:
+            {symbol: {endpoint: data}}, endpoints in the same order for every symbol
+        """
+        symbols = list(dict.fromkeys(self._validate_symbol(symbol) for symbol in symbols))
+        self.logger.info(f"Fetching all data for {', '.join(symbols)}")
+
+        # (symbol, endpoint) -> fetcher / cache key
+        fetchers = {}
+        cache_keys = {}
+        for symbol in symbols:
+            endpoint_fetchers, endpoint_keys = self._all_data_endpoints(symbol, from_date, to_date)
+            for endpoint, fetcher in endpoint_fetchers.items():
+                fetchers[symbol, endpoint] = fetcher
+                cache_keys[symbol, endpoint] = endpoint_keys[endpoint]
 
         data = {}
+        # One round-trip for every cached endpoint of every symbol
+        cached = self.cache.mget(list(cache_keys.values()))
+        for task, value in zip(cache_keys, cached):
+            if value is not None:
+                self._count('cache_hits')
+                data[task] = value
+        misses = {task: fetcher for task, fetcher in fetchers.items() if task not in data}
+
+        future_map = {fetch_executor.submit(fetcher): task for task, fetcher in misses.items()}
+        for future in as_completed(future_map):
+            symbol, endpoint = future_map[future]
+            try:
+                data[symbol, endpoint] = future.result()
+            except Exception as e:
+                self.logger.warning(f"Failed to fetch {endpoint} for {symbol}: {e}")
+                data[symbol, endpoint] = None
+
+        # Group by symbol, keeping the fetcher order regardless of completion order
+        results = {symbol: {} for symbol in symbols}
+        for symbol, endpoint in fetchers:
+            results[symbol][endpoint] = data[symbol, endpoint]
+        return results
 
-        # Define fetchers with their keys
+    def _all_data_endpoints(self, symbol: str, from_date: str, to_date: str) -> tuple[Dict[str, Callable], Dict[str, str]]:
+        """Get the get_all_data fetchers for a symbol and the cache key each one reads."""
         fetchers = {
-            'price': lambda: self.fetch_price(symbol),
+            'price': lambda: self.get_price(symbol),
             'financials': lambda: self.get_basic_financials(symbol),
             'recommendations': lambda: self.get_recommendations(symbol),
             'insider_transactions': lambda: self.get_insider_transactions(symbol, from_date, to_date),
@@ -264,15 +442,124 @@ class DataProvider:
             'company_profile': lambda: self.get_company_profile(symbol),
             'company_peers': lambda: self.get_company_peers(symbol),
         }
+        key_args = {'symbol': symbol, 'from_date': from_date, 'to_date': to_date}
+        cache_keys = {
+            'price': CACHE_KEYS['quote'].format_map(key_args),
+            'financials': CACHE_KEYS['financials'].format_map(key_args),
+            'recommendations': CACHE_KEYS['recommendations'].format_map(key_args),
+            'insider_transactions': CACHE_KEYS['insiders'].format_map(key_args),
+            'insider_sentiment': CACHE_KEYS['insider_sentiment'].format_map(key_args),
+            'company_profile': CACHE_KEYS['profile'].format_map(key_args),
+            'company_peers': CACHE_KEYS['peers'].format_map(key_args),
+        }
+        return fetchers, cache_keys
+
+    def warm(self, symbols: List[str]) -> int:
+        """
+        Prefetch the long-TTL endpoints (financials, profile, peers) for a
+        watchlist so the first real query hits a warm cache. Calls go through
+        the usual token bucket, at most MARKET_FETCH_CONCURRENCY at a time.
 
-        for key, fetcher in fetchers.items():
+        Args:
+            symbols: Stock symbols to warm
+
+        Returns:
+            Number of endpoints fetched or already cached
+        """
+        fetchers = (self.get_basic_financials, self.get_company_profile, self.get_company_peers)
+        warmed = 0
+        futures = [market_executor.submit(fetcher, symbol) for symbol in symbols for fetcher in fetchers]
+        for future in as_completed(futures):
             try:
-                data[key] = fetcher()
+                future.result()
+                warmed += 1
             except Exception as e:
-                self.logger.warning(f"Failed to fetch {key} for {symbol}: {e}")
-                data[key] = None
+                self.logger.warning(f"Cache warm-up failed: {e}")
+        self.logger.info(f"Warmed {warmed}/{len(futures)} endpoints for {len(symbols)} symbols")
+        return warmed
 
-        return data
+    def invalidate(self, symbol: str, *kinds: str) -> None:
+        """
+        Evict a symbol's cached endpoints in every process. Driven by write
+        events (trades, admin signals); the TTLs remain as a safety net.
+
+        Args:
+            symbol: Stock symbol
+            kinds: CACHE_KEYS names to evict (default: all of SYMBOL_CACHE_KEYS)
+        """
+        symbol = self._validate_symbol(symbol)
+        keys = [CACHE_KEYS[kind].format(symbol=symbol) for kind in kinds or SYMBOL_CACHE_KEYS]
+        with self._xfetch_lock:
+            for key in keys:
+                self._xfetch.pop(key, None)
+        self.cache.invalidate(*keys)
+
+    def listen_trades(self, symbols: List[str]) -> threading.Thread:
+        """
+        Subscribe to Finnhub's trade stream on a daemon thread and evict the
+        cached quote of every symbol that trades. Reconnects automatically.
+
+        Args:
+            symbols: Stock symbols to subscribe to
+
+        Returns:
+            The listener thread
+        """
+        thread = threading.Thread(
+            target=asyncio.run, args=(self._trade_stream(symbols),), daemon=True, name="finnhub-trades"
+        )
+        thread.start()
+        return thread
+
+    async def _trade_stream(self, symbols: List[str]) -> None:
+        """Run the trade-stream websocket, resubscribing after every reconnect."""
+        async for ws in ws_connect(FINNHUB_WS_URL.format(token=FINNHUB_API_KEY)):
+            try:
+                for symbol in symbols:
+                    await ws.send(orjson.dumps({'type': 'subscribe', 'symbol': symbol}).decode())
+                async for message in ws:
+                    self._on_trade_message(message)
+            except ConnectionClosed:
+                self.logger.warning("Finnhub trade stream closed, reconnecting")
+
+    def _on_trade_message(self, message: str | bytes) -> None:
+        """
+        Evict the quote of each symbol in a trade message. Liquid symbols trade
+        many times a second, so a symbol is evicted at most once per quote TTL;
+        otherwise its quote would never stay cached.
+        """
+        payload = orjson.loads(message)
+        if payload.get('type') != 'trade':
+            return
+        now = time.monotonic()
+        for symbol in {trade['s'] for trade in payload.get('data', [])}:
+            if now - self._quote_evicted_at.get(symbol, float('-inf')) < self.cache_ttl['quote']:
+                continue
+            self._quote_evicted_at[symbol] = now
+            self.invalidate(symbol, 'quote')
+
+    async def get_all_data_many(self, symbols: List[str], from_date: str, to_date: str) -> Dict[str, Dict]:
+        """
+        Fetch all available data for many symbols from one event loop.
+        At most MARKET_FETCH_CONCURRENCY symbols are in flight at once; the
+        shared token bucket still bounds the overall request rate.
+
+        Args:
+            symbols: Stock symbols
+            from_date: Start date (YYYY-MM-DD)
+            to_date: End date (YYYY-MM-DD)
+
+        Returns:
+            {symbol: get_all_data result}
+        """
+        semaphore = asyncio.Semaphore(MARKET_FETCH_CONCURRENCY)
+
+        async def fetch(symbol: str) -> Dict:
+            async with semaphore:
+                return await asyncio.to_thread(self.get_all_data, symbol, from_date, to_date)
+
+        results = await asyncio.gather(*(fetch(symbol) for symbol in symbols))
+        return dict(zip(symbols, results))
 
     ########################################
     ###### Helper methods #################
@@ -318,29 +605,124 @@ class DataProvider:
             cached = self.cache.get(cache_key)
             if cached is not None:
                 self.logger.debug(f"Cache HIT: {cache_key}")
-                self.stats['cache_hits'] += 1
+                self._count('cache_hits')
+                if self._should_refresh_early(cache_key):
+                    self._refresh_in_background(cache_key, fetch_func, ttl)
                 return cached
 
             self.logger.debug(f"Cache MISS: {cache_key}")
-            self.stats['cache_misses'] += 1
+            self._count('cache_misses')
+
+        future, is_leader = self._join_inflight(cache_key)
+        if not is_leader:
+            self.logger.debug(f"Waiting on in-flight fetch: {cache_key}")
+            return future.result()
+        return self._lead_fetch(future, cache_key, fetch_func, ttl, recheck=ttl > 0)
+
+    def _join_inflight(self, cache_key: str) -> tuple:
+        """Coalesce concurrent fetches: the first caller leads, the rest wait on its Future."""
+        with self._inflight_lock:
+            future = self._inflight.get(cache_key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._inflight[cache_key] = future
+            return future, True
+
+    def _lead_fetch(self, future: Future, cache_key: str, fetch_func: Callable, ttl: int,
+                    recheck: bool = False) -> Any:
+        """
+        Fetch as the single-flight leader and publish the result to any waiters.
+        With recheck, the cache is read again first: a previous leader may have
+        stored the value between this caller's miss and its becoming leader.
+        """
+        try:
+            data = self.cache.get(cache_key) if recheck else None
+            if data is None:
+                data = self._fetch_from_api(cache_key, fetch_func, ttl)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(data)
+            return data
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(cache_key, None)
+
+    def _should_refresh_early(self, cache_key: str) -> bool:
+        """
+        XFetch (Vattani et al.): refresh before expiry with a probability
+        that rises as expiry nears and with how long the fetch takes, so
+        keys written together don't all expire in the same instant.
+        """
+        meta = self._xfetch.get(cache_key)
+        if meta is None or XFETCH_BETA <= 0:
+            return False
+        expires_at, fetch_seconds = meta
+        if time.monotonic() >= expires_at:
+            # The Redis entry has expired too; nothing left to refresh early
+            with self._xfetch_lock:
+                self._xfetch.pop(cache_key, None)
+            return False
+        # 1 - random() is in (0, 1], so the log is always defined
+        return time.monotonic() - fetch_seconds * XFETCH_BETA * math.log(1.0 - random.random()) >= expires_at
+
+    def _remember_fetch(self, cache_key: str, ttl: int, fetch_seconds: float) -> None:
+        """Record a key's expiry and fetch time for XFetch, capped at XFETCH_MAX_KEYS."""
+        with self._xfetch_lock:
+            self._xfetch.pop(cache_key, None)
+            self._xfetch[cache_key] = (time.monotonic() + ttl, fetch_seconds)
+            while len(self._xfetch) > XFETCH_MAX_KEYS:
+                self._xfetch.popitem(last=False)
+
+    def _refresh_in_background(self, cache_key: str, fetch_func: Callable, ttl: int) -> None:
+        """Recompute a still-valid entry off the caller's thread via the single-flight path."""
+        future, is_leader = self._join_inflight(cache_key)
+        if not is_leader:
+            return
+        self.logger.debug(f"Early refresh: {cache_key}")
+
+        def refresh() -> None:
+            try:
+                self._lead_fetch(future, cache_key, fetch_func, ttl)
+            except Exception as e:
+                self.logger.warning(f"Early refresh failed for {cache_key}: {e}")
 
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _fetch_from_api(self, cache_key: str, fetch_func: Callable, ttl: int) -> Any:
+        """
+        Call the API with rate limiting and retries, caching the result.
+
+        Args:
+            cache_key: Redis cache key
+            fetch_func: Function that performs the API call
+            ttl: Time-to-live in seconds (0 = no cache)
+
+        Returns:
+            Data from API
+        """
         # Rate limit check
         self._check_rate_limit()
 
         # Fetch from API with retry logic
         max_retries = 3
         retry_count = 0
+        waited = 0.0
 
         while retry_count < max_retries:
             try:
+                started = time.monotonic()
                 data = fetch_func()
+                fetch_seconds = time.monotonic() - started
 
-                # Cache if TTL > 0
                 if ttl > 0:
+                    self._remember_fetch(cache_key, ttl, fetch_seconds)
                     self.cache.set(cache_key, data, ttl=ttl)
 
                 # Track API call
-                self.stats['api_calls'] += 1
+                self._count('api_calls')
 
                 return data
 
@@ -348,18 +730,21 @@ class DataProvider:
                 retry_count += 1
                 error_code = getattr(e, 'status_code', None)
 
-                # Rate limit error - sleep and retry
-                if error_code == 429:
-                    self.logger.warning(f"Rate limit hit (429). Retry {retry_count}/{max_retries}")
-                    self._track_error('rate_limit_429')
-                    time.sleep(60)
-                    continue
-
-                # Server errors - retry with exponential backoff
-                elif error_code in (500, 503):
-                    self.logger.warning(f"Server error ({error_code}). Retry {retry_count}/{max_retries}")
-                    self._track_error(f'server_error_{error_code}')
-                    time.sleep(2 ** retry_count)
+                # Rate limit / server errors - sleep with jitter and retry,
+                # giving up once the total wait would exceed RETRY_MAX_DELAY
+                if error_code in (429, 500, 503):
+                    if error_code == 429:
+                        self._track_error('rate_limit_429')
+                    else:
+                        self._track_error(f'server_error_{error_code}')
+                    delay = self._retry_delay(e, retry_count)
+                    if retry_count >= max_retries or waited + delay > RETRY_MAX_DELAY:
+                        raise
+                    waited += delay
+                    self.logger.warning(
+                        f"API error ({error_code}). Retry {retry_count}/{max_retries} in {delay:.2f}s"
+                    )
+                    time.sleep(delay)
                     continue
 
                 # Invalid API key - raise immediately
@@ -385,29 +770,49 @@ class DataProvider:
 
         raise Exception(f"Failed after {max_retries} retries")
 
-    def _check_rate_limit(self) -> None:
+    def _retry_delay(self, error: Exception, retry_count: int) -> float:
         """
-        Ensure we don't exceed rate limit.
-        Uses sliding window: track last 60 API calls.
+        Seconds to wait before retrying a failed call.
+        Honors a Retry-After header when Finnhub sends one; otherwise uses
+        full jitter (uniform between 0 and the capped backoff) so concurrent
+        callers don't all retry at the same moment.
         """
-        current_time = time.time()
-
-        # Clean up old timestamps (older than 60 seconds)
-        while self.api_call_times and current_time - self.api_call_times[0] > 60:
-            self.api_call_times.popleft()
+        response = getattr(error, 'response', None)
+        retry_after = getattr(response, 'headers', None) or {}
+        retry_after = retry_after.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), RETRY_MAX_DELAY)
+            except ValueError:
+                pass
 
-        # Check if we're at the limit
-        if len(self.api_call_times) >= self.requests_per_minute:
-            oldest_call = self.api_call_times[0]
-            wait_time = 60 - (current_time - oldest_call)
+        base = 60 if getattr(error, 'status_code', None) == 429 else 2 ** retry_count
+        return random.uniform(0, min(RETRY_MAX_DELAY, base))
 
+    def _check_rate_limit(self) -> None:
+        """
+        Ensure we don't exceed rate limit.
+        Uses a token bucket: holds up to requests_per_minute tokens, refilled at
+        requests_per_minute / 60 tokens per second. A caller that finds the
+        bucket empty reserves its token (balance goes negative) and sleeps
+        outside the lock until that token has been refilled.
+        """
+        with self._rate_limit_lock:
+            now = time.monotonic()
+            rate = self.requests_per_minute / 60.0
+            self._tokens = min(
+                float(self.requests_per_minute),
+                self._tokens + (now - self._last_refill) * rate
+            )
+            self._last_refill = now
+            self._tokens -= 1
+            wait_time = -self._tokens / rate if self._tokens < 0 else 0.0
             if wait_time > 0:
-                self.logger.warning(f"Rate limit reached. Waiting {wait_time:.1f}s")
-                self.stats['rate_limit_waits'] += 1
-                time.sleep(wait_time)
+                self._count('rate_limit_waits')
 
-        # Add current call timestamp
-        self.api_call_times.append(time.time())
+        if wait_time > 0:
+            self.logger.warning(f"Rate limit reached. Waiting {wait_time:.1f}s")
+            time.sleep(wait_time)
 
     def _validate_symbol(self, symbol: str) -> str:
         """
@@ -417,7 +822,7 @@ class DataProvider:
             symbol: Stock ticker
 
         Returns:
-            Normalized symbol (uppercase, stripped)
+            Normalized symbol (uppercase, stripped, interned)
 
         Raises:
             ValueError: If symbol is invalid
@@ -425,7 +830,8 @@ class DataProvider:
         if not symbol or not isinstance(symbol, str):
             raise ValueError("Symbol must be a non-empty string")
 
-        symbol = symbol.strip().upper()
+        # Interned so every cache key and dict lookup for a ticker shares one object
+        symbol = sys.intern(symbol.strip().upper())
 
         if not symbol:
             raise ValueError("Symbol cannot be empty")
@@ -440,9 +846,20 @@ class DataProvider:
 
     def _track_error(self, error_type: str) -> None:
         """Track error occurrence in stats."""
-        if error_type not in self.stats['errors']:
-            self.stats['errors'][error_type] = 0
-        self.stats['errors'][error_type] += 1
+        with self._stats_lock:
+            self.stats['errors'][error_type] += 1
+
+    def _count(self, field: str) -> None:
+        """Increment a stats counter; safe to call from worker threads."""
+        with self._stats_lock:
+            self.stats[field] += 1
+
+    @property
+    def cache_hit_rate(self) -> float:
+        """Share of cache lookups served from cache (0.0 before any lookup).
+        Cheap enough for hot paths that only need this one number."""
+        total_cache_access = self.stats['cache_hits'] + self.stats['cache_misses']
+        return self.stats['cache_hits'] / total_cache_access if total_cache_access > 0 else 0.0
 
     def get_statistics(self) -> Dict:
         """
@@ -452,32 +869,37 @@ class DataProvider:
             Dictionary with api_calls, cache_hits, cache_misses,
             cache_hit_rate, errors, and rate_limit_waits
         """
-        total_cache_access = self.stats['cache_hits'] + self.stats['cache_misses']
-        cache_hit_rate = (
-            self.stats['cache_hits'] / total_cache_access
-            if total_cache_access > 0
-            else 0.0
-        )
-
-        return {
-            'api_calls': self.stats['api_calls'],
-            'cache_hits': self.stats['cache_hits'],
-            'cache_misses': self.stats['cache_misses'],
-            'cache_hit_rate': cache_hit_rate,
-            'errors': self.stats['errors'].copy(),
-            'rate_limit_waits': self.stats['rate_limit_waits']
-        }
-
-    def interact_anthropic(self, prompt: str) -> str:
-        message = self.anthropic_client.messages.create(
-            model=llm_models["claude-sonnet-4-5"],
+        with self._stats_lock:
+            return {
+                'api_calls': self.stats['api_calls'],
+                'cache_hits': self.stats['cache_hits'],
+                'cache_misses': self.stats['cache_misses'],
+                'cache_hit_rate': self.cache_hit_rate,
+                'errors': dict(self.stats['errors']),
+                'rate_limit_waits': self.stats['rate_limit_waits']
+            }
+
+    def interact_anthropic(self, prompt: str) -> Iterator[str]:
+        """
+        Stream a reply from the default model, yielding text as it arrives.
+        The constant system prompt is marked for prompt caching so repeated
+        calls reuse it server-side.
+        """
+        with self.anthropic_client.messages.stream(
+            model=DEFAULT_LLM_MODEL,
             max_tokens=1024,
-            system="You are a data fetcher bot that provides concise and accurate information. For understanding of other roles, build context but do not respond as them.",
+            system=[
+                {
+                    "type": "text",
+                    "text": SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
             messages=[
                 {
                     "role": "user",
                     "content": prompt
                 }
             ]
-        )
-        return message
+        ) as stream:
+            yield from stream.text_stream
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from config import settings
+
+
+class FileCache:
+    """On-disk cache for OHLCV history DataFrames.
+
+    Each entry is a pickled DataFrame at {root}/{symbol}/{period}_{interval}.pkl
+    with a JSON sidecar recording when it was fetched, so repeated runs within
+    the TTL skip the download entirely.
+    """
+
+    def __init__(self, root: str = None, ttl: int = None):
+        self.root = root or settings.HISTORY_CACHE_DIR
+        self.ttl = settings.CACHE_TTL['candles'] if ttl is None else ttl
+
+    def _paths(self, symbol: str, period: str, interval: str) -> tuple[str, str]:
+        """Get the (data, sidecar) paths for an entry."""
+        base = os.path.join(self.root, symbol.strip().upper(), f"{period}_{interval}")
+        return f"{base}.pkl", f"{base}.json"
+
+    def get(self, symbol: str, period: str, interval: str = "1d") -> pd.DataFrame | None:
+        """Get cached history if it is younger than the TTL.
+
+        Args:
+            symbol: Stock symbol
+            period: yfinance period (e.g. "1y")
+            interval: yfinance bar interval
+
+        Returns:
+            Cached DataFrame or None if missing/expired/unreadable
+        """
+        data_path, meta_path = self._paths(symbol, period, interval)
+        try:
+            with open(meta_path) as f:
+                fetched_at = json.load(f)["fetched_at"]
+            if time.time() - fetched_at >= self.ttl:
+                return None
+            return pd.read_pickle(data_path)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, symbol: str, period: str, history: pd.DataFrame, interval: str = "1d") -> None:
+        """Store history, replacing any previous entry atomically.
+
+        Args:
+            symbol: Stock symbol
+            period: yfinance period (e.g. "1y")
+            history: DataFrame to cache
+            interval: yfinance bar interval
+        """
+        data_path, meta_path = self._paths(symbol, period, interval)
+        directory = os.path.dirname(data_path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to temp files first so readers never see a half-written entry
+        fd, tmp_data = tempfile.mkstemp(dir=directory, suffix=".pkl.tmp")
+        os.close(fd)
+        history.to_pickle(tmp_data)
+        os.replace(tmp_data, data_path)
+
+        fd, tmp_meta = tempfile.mkstemp(dir=directory, suffix=".json.tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"fetched_at": time.time(), "rows": len(history)}, f)
+        os.replace(tmp_meta, meta_path)
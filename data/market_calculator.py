@@ -1,36 +1,171 @@
+import asyncio
+import bisect
+import math
+import random
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
 import numpy as np
-import sys
-from pathlib import Path
-import os
-from dotenv import load_dotenv
 import yfinance as yf
-import anthropic
-import finnhub
-import ta
+from yfinance.exceptions import YFRateLimitError
 import pandas as pd
 
 
-sys.path.append(str(Path(__file__).resolve().parents[1]))
-
 from data import data_provider
 from data import cache_manager
+from data import _indicators_nb
+from data.history_cache import FileCache
 from config import settings
 
 
-# Load env variables
-load_dotenv()
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
-FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")
-
-anthropic_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-finnhub_client = finnhub.Client(api_key=FINNHUB_API_KEY)
+# One download per symbol covers every indicator (MA200 needs the longest window)
+HISTORY_PERIOD = "1y"
+# Trading days in the windows the indicators were designed around
+VIX_WINDOW = 21      # ~30 calendar days
+THREE_MONTHS = 63
+# Condition labels: label i covers [THRESHOLDS[i-1], THRESHOLDS[i])
+_VIX_THRESHOLDS = (10, 15, 20, 25, 30, 40, 50)
+_VIX_LABELS = (
+    "extremely_calm", "very_calm", "calm", "slightly_nervous",
+    "getting_worried", "fear", "extreme_fear", "extreme_panic",
+)
+_ADX_THRESHOLDS = (20, 40, 60)
+_ADX_LABELS = ("weak trend", "moderate trend", "strong trend", "very strong trend")
+
+# Attempts per yfinance download before a rate-limit error is raised
+HISTORY_MAX_ATTEMPTS = 3
+# fetch_market results are cached per symbol and UTC hour: {prefix}{SYMBOL}:{YYYYMMDDHH}
+MARKET_CACHE_PREFIX = "indicators:"
+
+
+def _ticker(symbol: str) -> yf.Ticker:
+    """Get the calling thread's yfinance Ticker for a symbol (built once, then reused)."""
+    return _session_ticker(symbol, data_provider.yahoo_session())
+
+
+@lru_cache(maxsize=1024)
+def _session_ticker(symbol: str, session) -> yf.Ticker:
+    """Process-wide Ticker cache, keyed by session so a Ticker never crosses threads."""
+    return yf.Ticker(symbol, session=session)
+
+
+def _as_float(value: float | None) -> float:
+    """Read back a cached float; orjson stores NaN as null."""
+    return float("nan") if value is None else value
+
+
+def stack_closes(histories: list) -> np.ndarray:
+    """Stack closing prices into an (N, T) matrix, right-aligned on the latest bar.
+
+    Shorter histories are padded with NaN at the start, so every row ends on
+    its own most recent close.
+
+    Args:
+        histories (list): One OHLCV DataFrame per symbol.
+
+    Returns:
+        np.ndarray: float64 matrix with one row per symbol.
+    """
+    length = max((len(history) for history in histories), default=0)
+    closes = np.full((len(histories), length), np.nan)
+    for row, history in enumerate(histories):
+        values = history["Close"].to_numpy(dtype=float)
+        if values.size:
+            closes[row, length - values.size:] = values
+    return closes
+
+
+def _ewm_rows(values: np.ndarray, **kwargs) -> np.ndarray:
+    """Row-wise pandas EWM over a (N, T) matrix (one C pass per call)."""
+    return pd.DataFrame(values.T).ewm(adjust=False, **kwargs).mean().to_numpy().T
+
+
+def close_indicators_batch(closes: np.ndarray, rsi_period: int = 14, bb_period: int = 20,
+                           num_std_dev: float = 2) -> dict:
+    """Close-price indicators for many symbols at once.
+
+    Computes the same values as MarketCalculator.calculate_ma / calculate_rsi /
+    calculate_macd / calculate_bollinger_bands, but on the stacked (N, T)
+    matrix from stack_closes so each step is one vectorized pass over all
+    symbols.
+
+    Args:
+        closes (np.ndarray): (N, T) closes, NaN-padded at the start.
+        rsi_period (int): RSI smoothing period.
+        bb_period (int): Bollinger window.
+        num_std_dev (float): Bollinger band width in standard deviations.
+
+    Returns:
+        dict: Arrays of length N keyed by ma50, ma200, rsi, macd, macd_signal,
+        macd_histogram, bb_upper, bb_lower, bb_middle.
+    """
+    n, length = closes.shape
+    counts = np.count_nonzero(~np.isnan(closes), axis=1)
+
+    def tail(window: int) -> np.ndarray:
+        return closes[:, -window:] if length >= window else np.full((n, window), np.nan)
+
+    # Moving averages: a NaN anywhere in the window means too little history
+    ma50 = tail(50).mean(axis=1)
+    ma200 = tail(200).mean(axis=1)
+
+    # Bollinger bands on the last window (sample std, as rolling().std())
+    window = tail(bb_period)
+    bb_middle = window.mean(axis=1)
+    bb_std = window.std(axis=1, ddof=1)
+
+    # RSI with Wilder smoothing; EWM starts at each row's first valid change
+    delta = np.diff(closes, axis=1)
+    gain = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0))
+    loss = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0))
+    avg_gain = _ewm_rows(gain, alpha=1 / rsi_period)[:, -1] if length > 1 else np.full(n, np.nan)
+    avg_loss = _ewm_rows(loss, alpha=1 / rsi_period)[:, -1] if length > 1 else np.full(n, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), rsi)
+    rsi = np.where(counts > rsi_period, rsi, np.nan)
+
+    # MACD (12, 26, 9) on the last 47 bars, zeros while warming up
+    short_period, long_period, signal_period = 12, 26, 9
+    calc_period = short_period + long_period + signal_period
+    recent = tail(calc_period)
+    macd_line = (_ewm_rows(recent, span=short_period, min_periods=short_period)
+                 - _ewm_rows(recent, span=long_period, min_periods=long_period))
+    signal_line = _ewm_rows(macd_line, span=signal_period, min_periods=signal_period)
+    enough = counts >= calc_period
+    macd = np.where(enough, np.nan_to_num(macd_line[:, -1]), 0.0)
+    signal = np.where(enough, np.nan_to_num(signal_line[:, -1]), 0.0)
+    histogram = np.where(enough, np.nan_to_num(macd_line[:, -1] - signal_line[:, -1]), 0.0)
+
+    return {
+        "ma50": ma50,
+        "ma200": ma200,
+        "rsi": rsi,
+        "macd": macd,
+        "macd_signal": signal,
+        "macd_histogram": histogram,
+        "bb_upper": bb_middle + bb_std * num_std_dev,
+        "bb_lower": bb_middle - bb_std * num_std_dev,
+        "bb_middle": bb_middle,
+    }
 
 
 class MarketCalculator:
 
-    def __init__(self):
-        self.cache_manager = cache_manager.CacheManager()
-        self.data_provider = data_provider.DataProvider(
+    def __init__(self, provider: data_provider.DataProvider = None,
+                 cache: cache_manager.CacheManager = None,
+                 history_cache: FileCache = None):
+        """
+        Args:
+            provider (DataProvider): _shared data provider (built on demand if omitted)_
+            cache (CacheManager): _shared cache (defaults to the singleton)_
+            history_cache (FileCache): _on-disk OHLCV cache (defaults to settings.HISTORY_CACHE_DIR)_
+        """
+        self.history_cache = history_cache or FileCache()
+        self.cache_manager = cache or cache_manager.CacheManager()
+        self.data_provider = provider or data_provider.DataProvider(
+            cache_manager=self.cache_manager,
             requests_per_minute=settings.RATE_LIMIT_PER_MINUTE
         )
 
@@ -38,100 +173,304 @@ class MarketCalculator:
         # Implement data preparation logic here
         pass
 
+    def _get_history(self, symbol: str, force_refresh: bool = False) -> pd.DataFrame:
+        """Get the OHLCV history every indicator is sliced from.
+
+        Served from the on-disk history cache when fresh; otherwise downloaded
+        from yfinance and written back.
+
+        Args:
+            symbol (str): The stock symbol to fetch history for.
+            force_refresh (bool): Skip the disk cache and download again.
+
+        Returns:
+            pd.DataFrame: Daily bars covering HISTORY_PERIOD.
+        """
+        if not force_refresh:
+            history = self.history_cache.get(symbol, HISTORY_PERIOD)
+            if history is not None:
+                return history
+
+        history = self._download_history(symbol)
+        if not history.empty:
+            self.history_cache.set(symbol, HISTORY_PERIOD, history)
+        return history
+
+    def _download_history(self, symbol: str) -> pd.DataFrame:
+        """Download history from yfinance, backing off with full jitter on 429s."""
+        if settings.HISTORY_SOURCE == "chart":
+            bars = self.data_provider.raw_history(symbol, HISTORY_PERIOD)
+            return pd.DataFrame(
+                {
+                    "Open": bars["open"],
+                    "High": bars["high"],
+                    "Low": bars["low"],
+                    "Close": bars["close"],
+                    "Volume": bars["volume"],
+                },
+                index=pd.to_datetime(bars["timestamp"], unit="s"),
+            )
+        for attempt in range(1, HISTORY_MAX_ATTEMPTS + 1):
+            try:
+                return _ticker(symbol).history(period=HISTORY_PERIOD)
+            except YFRateLimitError:
+                if attempt == HISTORY_MAX_ATTEMPTS:
+                    raise
+                time.sleep(random.uniform(0, min(settings.RETRY_MAX_DELAY, 2 ** attempt)))
+
     def fetch_market(self, symbol) -> dict:
         """Fetch market data for a specific symbol.
 
         Args:
             symbol (str): The stock symbol to fetch data for.
 
+        Only the history-derived indicators are cached (for
+        settings.ttl_for("indicators")); the price is read on every call
+        through the data provider's short-lived quote cache.
+
         Returns:
             dict: A dictionary containing various market indicators.
         """
         current_price = self.data_provider.get_current_price(symbol)
-        vix = self.calculate_vix(symbol)
-        vix_condition = self.check_vix_condition(vix)
-        ma = self.calculate_ma(symbol)
-        rsi = self.calculate_rsi(symbol)
-        rsi_condition = self.check_rsi_condition(rsi)
-        macd = self.calculate_macd(symbol)
-        macd_condition = self.check_macd_condition(macd)
-        bollinger_bands = self.calculate_bollinger_bands(symbol)
-        bollinger_condition = self.check_bollinger_condition(bollinger_bands, symbol)
-        adx = self.calculate_adx(symbol)
-        obv = self.calculate_obv(symbol)
+        key = self.market_key(symbol)
+        indicators = self.cache_manager.get(key)
+        if indicators is None:
+            history = self._get_history(symbol)
+            _, ma50, ma200, _ = self.calculate_ma(history, current_price)
+            indicators = self._history_indicators(
+                history,
+                ma=(ma50, ma200),
+                rsi=self.calculate_rsi(history),
+                macd=self.calculate_macd(history),
+                bollinger_bands=self.calculate_bollinger_bands(history),
+            )
+            self.cache_manager.set(key, indicators, ttl=settings.ttl_for("indicators"))
+        return self._assemble_market(indicators, current_price)
+
+    @staticmethod
+    def market_key(symbol: str) -> str:
+        """Get the cache key for a symbol's history indicators in the current UTC hour."""
+        return f"{MARKET_CACHE_PREFIX}{symbol.strip().upper()}:{datetime.now(timezone.utc):%Y%m%d%H}"
+
+    def _history_indicators(self, history: pd.DataFrame, ma: tuple, rsi: float,
+                            macd: dict, bollinger_bands: tuple) -> dict:
+        """Build the price-independent part of fetch_market (the part that is cached).
+
+        Args:
+            history (pd.DataFrame): Daily bars for the symbol.
+            ma (tuple): (ma50, ma200).
+            rsi (float): RSI value.
+            macd (dict): 'macd', 'signal' and 'histogram' values.
+            bollinger_bands (tuple): (upper, lower, middle).
+
+        Returns:
+            dict: Indicators derived from the history alone.
+        """
+        vix = self.calculate_vix(history.tail(VIX_WINDOW))
+        ma50, ma200 = ma
+        recommendation, confidence, message, result = self.check_macd_condition(macd)
+        upper, lower, middle = bollinger_bands
+        obv = self.calculate_obv(history.tail(THREE_MONTHS))
 
         return {
-            "current_price": current_price,
             "vix": vix,
-            "vix_condition": vix_condition,
-            "ma_current": ma[0],  # current price
-            "ma_50": ma[1],
-            "ma_100": ma[2],
-            "ma_trend": ma[3],
+            "vix_condition": self.check_vix_condition(vix),
+            "ma_50": ma50,
+            "ma_100": ma200,
             "rsi": rsi,
-            "rsi_condition": rsi_condition,
+            "rsi_condition": self.check_rsi_condition(rsi),
             "macd_value": macd["macd"],
             "macd_signal": macd["signal"],
             "macd_histogram": macd["histogram"],
-            "macd_recommendation": macd_condition[0],
-            "macd_confidence": macd_condition[1],
-            "macd_message": macd_condition[2],
-            "macd_result": macd_condition[3],
-            "bb_upper": bollinger_bands[0],
-            "bb_lower": bollinger_bands[1],
-            "bb_middle": bollinger_bands[2],
-            "bollinger_condition": bollinger_condition,
-            "adx": adx,
+            "macd_recommendation": recommendation,
+            "macd_confidence": confidence,
+            "macd_message": message,
+            "macd_result": result,
+            "bb_upper": upper,
+            "bb_lower": lower,
+            "bb_middle": middle,
+            "adx": self.calculate_adx(history),
             "obv": obv.get("obv"),
             "obv_ma": obv.get("obv_ma"),
             "obv_trend": obv.get("trend"),
-            "volume": obv.get("volume"), 
-            "obv_divergence": obv.get("divergence") 
+            "volume": obv.get("volume"),
+            "obv_divergence": obv.get("divergence")
+        }
+
+    def _assemble_market(self, indicators: dict, current_price: float) -> dict:
+        """Merge the latest price into cached history indicators.
+
+        Args:
+            indicators (dict): _history_indicators result (NaN may have round-tripped as None).
+            current_price (float): Latest price.
+
+        Returns:
+            dict: A dictionary containing various market indicators.
+        """
+        ma50, ma200 = _as_float(indicators["ma_50"]), _as_float(indicators["ma_100"])
+        bands = tuple(_as_float(indicators[band]) for band in ("bb_upper", "bb_lower", "bb_middle"))
+
+        return {
+            "current_price": current_price,
+            "vix": indicators["vix"],
+            "vix_condition": indicators["vix_condition"],
+            "ma_current": current_price,
+            "ma_50": indicators["ma_50"],
+            "ma_100": indicators["ma_100"],
+            "ma_trend": self._ma_trend(current_price, ma50, ma200),
+            "rsi": indicators["rsi"],
+            "rsi_condition": indicators["rsi_condition"],
+            "macd_value": indicators["macd_value"],
+            "macd_signal": indicators["macd_signal"],
+            "macd_histogram": indicators["macd_histogram"],
+            "macd_recommendation": indicators["macd_recommendation"],
+            "macd_confidence": indicators["macd_confidence"],
+            "macd_message": indicators["macd_message"],
+            "macd_result": indicators["macd_result"],
+            "bb_upper": indicators["bb_upper"],
+            "bb_lower": indicators["bb_lower"],
+            "bb_middle": indicators["bb_middle"],
+            "bollinger_condition": self.check_bollinger_condition(bands, current_price),
+            "adx": indicators["adx"],
+            "obv": indicators["obv"],
+            "obv_ma": indicators["obv_ma"],
+            "obv_trend": indicators["obv_trend"],
+            "volume": indicators["volume"],
+            "obv_divergence": indicators["obv_divergence"]
         }
 
     def fetch_all_markets(self, symbols: list) -> dict:
-        market_data = {}
-        for symbol in symbols:
-            market_data[symbol] = self.fetch_market(symbol)
-        return market_data
+        """Fetch market data for many symbols.
+
+        Prices (for every symbol) and uncached histories are downloaded on the
+        long-lived data_provider.market_executor (at most
+        settings.MARKET_FETCH_CONCURRENCY at once; Finnhub
+        calls still go through the data provider's token bucket). The
+        close-price indicators are then computed for all misses together by
+        close_indicators_batch.
+
+        Args:
+            symbols (list): Stock symbols.
 
+        Returns:
+            dict: {symbol: fetch_market result}, in the order given.
+        """
+        if not symbols:
+            return {}
+        indicators, missing = self._cached_indicators(symbols)
+        executor = data_provider.market_executor
+        prices = executor.map(self.data_provider.get_current_price, symbols)
+        histories = list(executor.map(self._get_history, missing))
+        prices = list(prices)
+        indicators.update(self._indicators_batch(missing, histories))
+        return {symbol: self._assemble_market(indicators[symbol], price) for symbol, price in zip(symbols, prices)}
+
+    async def fetch_all_markets_async(self, symbols: list) -> dict:
+        """Async variant of fetch_all_markets for callers already on an event loop.
+
+        Downloads are multiplexed with asyncio.gather, at most
+        settings.MARKET_FETCH_CONCURRENCY symbols in flight at once.
+
+        Args:
+            symbols (list): Stock symbols.
+
+        Returns:
+            dict: {symbol: fetch_market result}, in the order given.
+        """
+        if not symbols:
+            return {}
+        indicators, missing = self._cached_indicators(symbols)
+        semaphore = asyncio.Semaphore(settings.MARKET_FETCH_CONCURRENCY)
+        loop = asyncio.get_running_loop()
+
+        async def limited(func, symbol: str):
+            async with semaphore:
+                return await loop.run_in_executor(data_provider.market_executor, func, symbol)
+
+        prices, histories = await asyncio.gather(
+            asyncio.gather(*(limited(self.data_provider.get_current_price, symbol) for symbol in symbols)),
+            asyncio.gather(*(limited(self._get_history, symbol) for symbol in missing)),
+        )
+        indicators.update(self._indicators_batch(missing, list(histories)))
+        return {symbol: self._assemble_market(indicators[symbol], price) for symbol, price in zip(symbols, prices)}
+
+    def _cached_indicators(self, symbols: list) -> tuple[dict, list]:
+        """Read cached history indicators for many symbols in one MGET.
+
+        Returns:
+            tuple: ({symbol: indicators or None} in the order given, symbols still to compute)
+        """
+        cached = self.cache_manager.mget([self.market_key(symbol) for symbol in symbols])
+        indicators = dict(zip(symbols, cached))
+        return indicators, [symbol for symbol, value in indicators.items() if value is None]
+
+    def _indicators_batch(self, symbols: list, histories: list) -> dict:
+        """Compute close-price indicators for all symbols at once and cache each symbol's entry."""
+        if not symbols:
+            return {}
+        batch = close_indicators_batch(stack_closes(histories))
+        results = {
+            symbol: self._history_indicators(
+                histories[i],
+                ma=(float(batch["ma50"][i]), float(batch["ma200"][i])),
+                rsi=float(batch["rsi"][i]),
+                macd={
+                    "macd": float(batch["macd"][i]),
+                    "signal": float(batch["macd_signal"][i]),
+                    "histogram": float(batch["macd_histogram"][i]),
+                },
+                bollinger_bands=(
+                    float(batch["bb_upper"][i]), float(batch["bb_lower"][i]), float(batch["bb_middle"][i])
+                ),
+            )
+            for i, symbol in enumerate(symbols)
+        }
+        ttl = settings.ttl_for("indicators")
+        for symbol, indicators in results.items():
+            self.cache_manager.set(self.market_key(symbol), indicators, ttl=ttl)
+        return results
 
     ########################
     #### Calculations ####
     ########################
 
-    def calculate_vix(self, symbol) -> float:
-        # Implement VIX calculation logic here
-        # 1. set a range of call and put strikes on lookback_period
-        # Formula:
-
-        # fecth proice with data provider
-        history = self.data_provider.historical_30_data(symbol)
-        closings = history["Close"]
-        daily_returns = closings.pct_change().dropna()
+    def calculate_vix(self, history: pd.DataFrame) -> float:
+        """
+        Annualized realized volatility of the given bars, used as a VIX proxy.
+        Args:
+            history (pd.DataFrame): _daily bars (fetch_market passes the last ~30 days)_
+        Returns:
+            float: _annualized volatility in percent_
+        """
+        closings = history["Close"].to_numpy(dtype=float)
+        closings = closings[~np.isnan(closings)]
+        if closings.size < 3:
+            return float("nan")
 
         # volatility meaning: standard deviation of daily returns, meaning how much the price fluctuates on a daily basis
-        volatility = daily_returns.std()
-        vix = volatility * np.sqrt(252) * 100  # Annualize the volatility
-        return vix
+        daily_returns = np.diff(closings) / closings[:-1]
+        volatility = daily_returns.std(ddof=1)
+        return float(volatility * np.sqrt(252) * 100)  # Annualize the volatility
 
-    def calculate_ma(self, symbol: str) -> tuple:
+    def calculate_ma(self, history: pd.DataFrame, current_price: float) -> tuple:
         """
         Calculate 50-day and 200-day moving averages and determine trend.
         ma = Moving Average = indicates trend direction
         Args:
-            symbol (str): _stock symbol_
+            history (pd.DataFrame): _daily bars_
+            current_price (float): _latest price_
         Returns:
-            tuple: _ma50, ma200, trend_
+            tuple: _current price, ma50, ma200, trend_
         """
-        ticker = yf.Ticker(symbol)
-        current_price = self.data_provider.get_current_price(symbol)
-        # history = self.data_provider.historical_30_data(symbol)
-        history50 = ticker.history(period="50d")
-        history200 = ticker.history(period="200d")
-        ma50 = float(np.mean(history50["Close"].rolling(window=50).mean().iloc[-1]))
-        ma200 = float(np.mean(history200["Close"].rolling(window=200).mean().iloc[-1]))
-
+        close = history["Close"].to_numpy(dtype=float)
+        # Only the latest value is needed; too little history gives NaN as rolling() did
+        ma50 = float(close[-50:].mean()) if close.size >= 50 else float("nan")
+        ma200 = float(close[-200:].mean()) if close.size >= 200 else float("nan")
+        return current_price, ma50, ma200, self._ma_trend(current_price, ma50, ma200)
+
+    @staticmethod
+    def _ma_trend(current_price: float, ma50: float, ma200: float) -> str:
+        """Classify the trend from the price and its moving averages."""
         trend = {
             "strong uptrend": current_price > ma50 > ma200,
             "uptrend": current_price > ma50 and ma50 < ma200,
@@ -142,39 +481,45 @@ class MarketCalculator:
 
         for key, value in trend.items():
             if value:
-                return current_price, ma50, ma200, key
+                return key
 
-        return current_price, ma50, ma200, "unknown"
+        return "unknown"
 
-    def calculate_rsi(self, symbol: str, period: int = 14) -> float:
+    def calculate_rsi(self, history: pd.DataFrame, period: int = 14) -> float:
         """RSI = Measures if a stock is "overbought" (too expensive) or "oversold" (too cheap)
 
         Args:
-            symbol (str): _stock symbol_
+            history (pd.DataFrame): _daily bars_
             period (int, optional): _lookback period_. Defaults to 14.
 
         Returns:
             float: _RSI value_
         """
-        ticker = yf.Ticker(symbol)
-        history = ticker.history(period="max")
-        close = history["Close"]
+        close = history["Close"].to_numpy(dtype=float)
+        if close.size <= period:
+            return float("nan")
 
-        delta = close.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        # Wilder's smoothing: EMA with alpha = 1/period over gains and losses
+        if _indicators_nb.HAVE_NUMBA:
+            avg_gain, avg_loss = _indicators_nb.rsi_wilder(close, period)
+        else:
+            delta = np.diff(close)
+            gain = np.where(delta > 0, delta, 0.0)
+            loss = np.where(delta < 0, -delta, 0.0)
+            avg_gain = pd.Series(gain).ewm(alpha=1 / period, adjust=False).mean().iloc[-1]
+            avg_loss = pd.Series(loss).ewm(alpha=1 / period, adjust=False).mean().iloc[-1]
 
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi.iloc[-1]
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else 50.0
+        return float(100 - 100 / (1 + avg_gain / avg_loss))
 
-    def calculate_macd(self, symbol: str) -> tuple:
+    def calculate_macd(self, history: pd.DataFrame) -> dict:
         """Calculate MACD and signal line
         MACD = Shows momentum (how fast price is changing) and trend direction
 
 
         Args:
-            symbol (str): _stock symbol_
+            history (pd.DataFrame): _daily bars_
 
         Returns:
             tuple: _MACD value, signal line value_
@@ -184,41 +529,32 @@ class MarketCalculator:
         long_period = 26
         signal_period = 9
 
-        ticker = yf.Ticker(symbol)
         calc_period = short_period + long_period + signal_period
-        history = ticker.history(period="{}d".format(calc_period))
-        close = history["Close"]
+        close = history["Close"].tail(calc_period)
 
         if len(close) < calc_period:
             return {"macd": 0.0, "signal": 0.0, "histogram": 0.0}
 
-        macd_indicator = ta.trend.MACD(
-            close,
-            window_slow=long_period,
-            window_fast=short_period,
-            window_sign=signal_period,
-        )
-
-        # current values
-        macd = macd_indicator.macd().iloc[-1]
-        signal_line = macd_indicator.macd_signal().iloc[-1]
-        histogram = macd_indicator.macd_diff().iloc[-1]
+        # EMAs as in ta.trend.MACD, computed once each
+        ema_fast = close.ewm(span=short_period, min_periods=short_period, adjust=False).mean()
+        ema_slow = close.ewm(span=long_period, min_periods=long_period, adjust=False).mean()
+        macd_line = ema_fast - ema_slow
+        signal_series = macd_line.ewm(span=signal_period, min_periods=signal_period, adjust=False).mean()
 
-        # Handle NaN
-        if pd.isna(macd):
-            macd = 0.0
-        if pd.isna(signal_line):
-            signal_line = 0.0
-        if pd.isna(histogram):
-            histogram = 0.0
+        # current values (NaN while the EMAs are still warming up -> 0.0)
+        macd = macd_line.iloc[-1]
+        signal_line = signal_series.iloc[-1]
+        macd, signal_line, histogram = np.nan_to_num(
+            np.array([macd, signal_line, macd - signal_line], dtype=np.float64), nan=0.0
+        ).tolist()
 
         return {
-            "macd": float(macd),
-            "signal": float(signal_line),
-            "histogram": float(histogram),
+            "macd": macd,
+            "signal": signal_line,
+            "histogram": histogram,
         }
 
-    def calculate_bollinger_bands(self, symbol: str) -> tuple:
+    def calculate_bollinger_bands(self, history: pd.DataFrame) -> tuple:
         """Calculate Bollinger Bands
         Bollinger Bands = Indicates volatility and potential overbought/oversold conditions
         upper band: indicates overbought
@@ -226,7 +562,7 @@ class MarketCalculator:
         middle band: indicates trend direction
 
         Args:
-            symbol (str): The stock symbol to calculate Bollinger Bands for.
+            history (pd.DataFrame): Daily bars to calculate Bollinger Bands from.
 
         Returns:
             tuple: A tuple containing the upper band, lower band, and middle band.
@@ -234,44 +570,68 @@ class MarketCalculator:
         period = 20
         num_std_dev = 2
 
-        ticker = yf.Ticker(symbol)
-        history = ticker.history(period="3mo")
-        close = history["Close"]
+        close = history["Close"].to_numpy(dtype=float)
+        if close.size < period:
+            return float("nan"), float("nan"), float("nan")
 
-        middle_band = close.rolling(window=period).mean()
-        std_dev = close.rolling(window=period).std()
+        # Only the latest band is used, so work on the last window alone
+        window = close[-period:]
+        middle_band = float(window.mean())
+        std_dev = float(window.std(ddof=1))  # sample std, as rolling().std()
         upper_band = middle_band + (std_dev * num_std_dev)
         lower_band = middle_band - (std_dev * num_std_dev)
 
-        return upper_band.iloc[-1], lower_band.iloc[-1], middle_band.iloc[-1]
+        return upper_band, lower_band, middle_band
 
-    def calculate_adx(self, symbol: str) -> float:
+    def calculate_adx(self, history: pd.DataFrame, period: int = 14) -> float:
         """Calculate Average Directional Index (ADX)
         ADX = Measures trend strength (not direction)
+        Uses Wilder smoothing (an EMA with alpha = 1/period) for ATR, the
+        directional indicators and the final DX average.
 
         Args:
-            symbol (str): The stock symbol to calculate ADX for.
+            history (pd.DataFrame): Daily bars to calculate ADX from.
+            period (int, optional): Smoothing period. Defaults to 14.
 
         Returns:
-            float: The ADX value.
+            float: The ADX value (0-100).
         """
-        ticker = yf.Ticker(symbol)
-        history = ticker.history(period="3mo")
-        high = history["High"]
-        low = history["Low"]
-        close = history["Close"]
-
-        # Calculate True Range (TR)
-        tr = pd.concat(
-            [high - low, (high - close.shift()).abs(), (low - close.shift()).abs()],
-            axis=1,
-        ).max(axis=1)
-
-        # Calculate ADX
-        adx = tr.rolling(window=14).mean()
-        return adx.iloc[-1]
-
-    def calculate_obv(self, symbol: str) -> dict:
+        high = history["High"].to_numpy(dtype=float)
+        low = history["Low"].to_numpy(dtype=float)
+        close = history["Close"].to_numpy(dtype=float)
+        if close.size < 2:
+            return float("nan")
+        if _indicators_nb.HAVE_NUMBA:
+            return float(_indicators_nb.adx_wilder(high, low, close, period))
+
+        prev_close = np.empty_like(close)
+        prev_close[0] = close[0]
+        prev_close[1:] = close[:-1]
+
+        # True Range
+        tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+        # Directional movement: only the larger, positive move counts
+        up_move = np.zeros_like(high)
+        down_move = np.zeros_like(low)
+        up_move[1:] = high[1:] - high[:-1]
+        down_move[1:] = low[:-1] - low[1:]
+        plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+        minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+        def wilder(values: np.ndarray) -> np.ndarray:
+            return pd.Series(values).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+
+        atr = wilder(tr)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            plus_di = 100 * wilder(plus_dm) / atr
+            minus_di = 100 * wilder(minus_dm) / atr
+            dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+
+        adx = wilder(np.nan_to_num(dx))
+        return float(adx[-1])
+
+    def calculate_obv(self, history: pd.DataFrame) -> dict:
         """Calculate On-Balance Volume (OBV) with volume analysis
     
             OBV = Measures buying/selling pressure using volume flow
@@ -285,27 +645,21 @@ class MarketCalculator:
             - Identifies volume spikes
     
         Args:
-            symbol (str): The stock symbol to calculate OBV for.
+            history (pd.DataFrame): Daily bars (fetch_market passes the last ~3 months).
         
         Returns:
             dict: OBV value, trend, signal, and volume metrics.
         """
-        ticker = yf.Ticker(symbol)
-        history = ticker.history(period="3mo")
         close = history["Close"]
         volume = history["Volume"]
     
-        # Calculate OBV
-        obv = pd.Series(index=close.index, dtype=float)
-        obv.iloc[0] = 0
-    
-        for i in range(1, len(close)):
-            if close.iloc[i] > close.iloc[i - 1]:
-                obv.iloc[i] = obv.iloc[i - 1] + volume.iloc[i]
-            elif close.iloc[i] < close.iloc[i - 1]:
-                obv.iloc[i] = obv.iloc[i - 1] - volume.iloc[i]
-            else:
-                obv.iloc[i] = obv.iloc[i - 1]
+        # Calculate OBV: running sum of volume signed by the day's price direction
+        if _indicators_nb.HAVE_NUMBA:
+            obv_values = _indicators_nb.obv_kernel(close.to_numpy(dtype=float), volume.to_numpy(dtype=float))
+        else:
+            direction = np.sign(np.diff(close.to_numpy(dtype=float), prepend=np.nan))
+            obv_values = (np.nan_to_num(direction) * volume.to_numpy(dtype=float)).cumsum()
+        obv = pd.Series(obv_values, index=close.index)
     
         # Determine OBV trend using 20-day moving average
         obv_ma = obv.rolling(window=20).mean()
@@ -378,18 +732,17 @@ class MarketCalculator:
     ### Checkers ##########
     ######################
 
-    def check_bollinger_condition(self, bands: tuple, symbol: str) -> str:
+    def check_bollinger_condition(self, bands: tuple, current_price: float) -> str:
         """Check Bollinger Bands condition
 
         Args:
             bands (tuple): The Bollinger Bands (upper, lower, middle).
-            symbol (str): The stock symbol to check.
+            current_price (float): The latest price to compare against the bands.
 
         Returns:
             str: The Bollinger Bands condition.
         """
         upper_band, lower_band, middle_band = bands
-        current_price = self.data_provider.get_current_price(symbol)
 
         if current_price > upper_band:
             return "overbought"
@@ -470,22 +823,17 @@ class MarketCalculator:
             return "neutral"
 
     def check_vix_condition(self, vix: float) -> str:
-        vix_classes = {
-            "extremely_calm": vix < 10,
-            "very_calm": 10 <= vix < 15,
-            "calm": 15 <= vix < 20,
-            "slightly_nervous": 20 <= vix < 25,
-            "getting_worried": 25 <= vix < 30,
-            "fear": 30 <= vix < 40,
-            "extreme_fear": vix >= 40,
-            "extreme_panic": vix > 50,
-        }
+        """Define VIX condition
 
-        for condition, is_met in vix_classes.items():
-            if is_met:
-                return condition
+        Args:
+            vix (float): _VIX value_
 
-        return "unknown"
+        Returns:
+            str: _VIX condition ("unknown" if the value is missing)_
+        """
+        if vix is None or math.isnan(vix):
+            return "unknown"
+        return _VIX_LABELS[bisect.bisect_right(_VIX_THRESHOLDS, vix)]
 
     def check_adx_condition(self, adx: float) -> str:
         """Define ADX condition
@@ -494,13 +842,8 @@ class MarketCalculator:
             adx (float): _ADX value_
 
         Returns:
-            str: _ADX condition_
+            str: _ADX condition ("unknown" if the value is missing)_
         """
-        if adx < 20:
-            return "weak trend"
-        elif 20 <= adx < 40:
-            return "moderate trend"
-        elif 40 <= adx < 60:
-            return "strong trend"
-        else:
-            return "very strong trend"
+        if adx is None or math.isnan(adx):
+            return "unknown"
+        return _ADX_LABELS[bisect.bisect_right(_ADX_THRESHOLDS, adx)]
@@ -1,8 +1,16 @@
 import anthropic
+import asyncio
 import yfinance as yf
 import os
+import time
 import finnhub
+import functools
+import threading
+import requests
+from curl_cffi.requests import AsyncSession
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 #load env variables
@@ -12,6 +20,15 @@ FINNHUB_API_KEY=os.getenv("FINNHUB_API_KEY")
 
 client = anthropic.Anthropic()
 finnhub_client = finnhub.Client(api_key=FINNHUB_API_KEY)
+# One pooled keep-alive session for every sync Finnhub call, so connections
+# stay warm across calls instead of re-handshaking. finnhub-python has no public
+# session hook, so only mount when its private requests session is there
+if isinstance(getattr(finnhub_client, '_session', None), requests.Session):
+    finnhub_client._session.mount('https://', HTTPAdapter(
+        pool_connections=10, pool_maxsize=20, max_retries=Retry(total=2, backoff_factor=0.2)
+    ))
+
+FINNHUB_API_URL = "https://finnhub.io/api/v1"
 
 ##### PROMPTS #########
 system_prompt = """
@@ -27,23 +44,27 @@ REASONING: [2-3 sentences explaining why]
 
 
 def interact(question:str) -> str:
-    message = client.messages.create(
-    model="claude-sonnet-4-5",
-    max_tokens=500,
-    messages=[
-        {
-            "role": "user",
-            "content": question
-        }
-    ]
-    )
-    return message
+    # Stream the reply so it prints as it arrives; still returns the full message
+    with client.messages.stream(
+        model="claude-sonnet-4-5",
+        max_tokens=500,
+        messages=[
+            {
+                "role": "user",
+                "content": question
+            }
+        ]
+    ) as stream:
+        for text in stream.text_stream:
+            print(text, end="", flush=True)
+        print()
+        return stream.get_final_message()
 
 def interact_agent(question:str) -> str:
     message = client.messages.create(
         model="claude-sonnet-4-5",
         max_tokens=500,
-        system=system_prompt,
+        system=[{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}],
         messages=[
             {
                 "role": "user",
@@ -53,19 +74,100 @@ def interact_agent(question:str) -> str:
     )
     return message
 
-def fetch_price(symbol:str) -> str:
-    quote = finnhub_client.quote(symbol)
-    #current_price = quote["c"]
-    return quote
-
-def fetch_news(symbol:str) -> str:
-    return finnhub_client.general_news("General", min_id=0)
-
-def fetch_insider(symbol:str) -> str:
-    return finnhub_client.stock_insider_transactions(symbol)
-
-def analyse_symbol(symbol:str) -> str:
-    quote = fetch_price(symbol)
+# Hit/miss counters for the fetch_*_async TTL caches (same names as DataProvider.stats)
+stats = {'cache_hits': 0, 'cache_misses': 0}
+
+def ttl_cache(ttl: float, maxsize: int = 1024):
+    # In-process cache for the async fetchers, keyed by the arguments after the
+    # session; entries expire after ttl seconds and the oldest is evicted past maxsize
+    def decorator(func):
+        entries = {}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        async def wrapper(session, *args):
+            now = time.monotonic()
+            with lock:
+                hit = entries.get(args)
+                if hit is not None and now - hit[0] < ttl:
+                    stats['cache_hits'] += 1
+                    return hit[1]
+                stats['cache_misses'] += 1
+            value = await func(session, *args)
+            with lock:
+                entries.pop(args, None)
+                entries[args] = (now, value)
+                while len(entries) > maxsize:
+                    entries.pop(next(iter(entries)))
+            return value
+
+        wrapper.cache_clear = entries.clear
+        return wrapper
+    return decorator
+
+def cache_hit_rate() -> float:
+    total = stats['cache_hits'] + stats['cache_misses']
+    return stats['cache_hits'] / total if total else 0.0
+
+@ttl_cache(ttl=60)
+async def fetch_price_async(session: AsyncSession, symbol: str) -> dict:
+    r = await session.get(f"{FINNHUB_API_URL}/quote", params={"symbol": symbol, "token": FINNHUB_API_KEY})
+    r.raise_for_status()
+    return r.json()
+
+@ttl_cache(ttl=3600)
+async def fetch_news_async(session: AsyncSession, symbol: str) -> list:
+    r = await session.get(f"{FINNHUB_API_URL}/news", params={"category": "general", "minId": 0, "token": FINNHUB_API_KEY})
+    r.raise_for_status()
+    return r.json()
+
+@ttl_cache(ttl=86400)
+async def fetch_insider_async(session: AsyncSession, symbol: str) -> dict:
+    r = await session.get(f"{FINNHUB_API_URL}/stock/insider-transactions", params={"symbol": symbol, "token": FINNHUB_API_KEY})
+    r.raise_for_status()
+    return r.json()
+
+async def fetch_all_async(symbols: list) -> dict:
+    # One HTTP/2 session for every request, all symbols in flight on one thread
+    async with AsyncSession(timeout=10) as session:
+        results = await asyncio.gather(*(
+            asyncio.gather(
+                fetch_price_async(session, symbol),
+                fetch_news_async(session, symbol),
+                fetch_insider_async(session, symbol),
+            )
+            for symbol in symbols
+        ))
+    return dict(zip(symbols, results))
+
+async def fetch_prices_batch_async(symbols: list, session: AsyncSession = None) -> dict:
+    # Finnhub has no multi-symbol quote endpoint on the free tier, so fetch the
+    # quotes concurrently over one session; fetch_price_async's TTL cache
+    # serves the fresh ones without a request. Pass a long-lived session to
+    # reuse its connections across calls
+    unique = list(dict.fromkeys(symbols))
+    if session is None:
+        async with AsyncSession(timeout=10) as session:
+            return await fetch_prices_batch_async(unique, session)
+    quotes = await asyncio.gather(*(fetch_price_async(session, symbol) for symbol in unique))
+    return dict(zip(unique, quotes))
+
+def _warm_anthropic():
+    # Open the pooled TLS connection to the API with a cheap public call
+    try:
+        client.models.list(limit=1)
+    except anthropic.APIError as e:
+        print(f"Anthropic warm-up failed: {e}")
+
+async def analyse_symbol(symbol:str, session: AsyncSession = None) -> str:
+    # The prompt needs the quote, so overlap the quote fetch with the
+    # Anthropic handshake instead of paying both round-trips back to back.
+    # Async so callers already on an event loop can await it directly
+    _, quotes = await asyncio.gather(
+        asyncio.to_thread(_warm_anthropic),
+        fetch_prices_batch_async([symbol], session),
+    )
+    quote = quotes[symbol]
     user_prompt = f"""
 Analyze {symbol} stock:
 
@@ -80,7 +182,7 @@ Today's Trading:
 
 Should we buy, hold, or sell this stock? Explain your reasoning.
 """
-    return interact_agent(user_prompt)
+    return await asyncio.to_thread(interact_agent, user_prompt)
 
 def test():
     question_counter = 0
@@ -90,8 +192,10 @@ def test():
     print(finnhub_client.quote("AAPL"))
     while question_counter < MAX_QUESTION:
         user_input = str(input("User: "))
-        output = interact(user_input)
-        print("Assistant: ", output)
+        # interact() streams the reply as it arrives, before the next prompt
+        print("Assistant: ", end="")
+        interact(user_input)
+        question_counter += 1
 
 
 
@@ -100,10 +204,10 @@ def main():
     symbol = "AAPL"
     info = []
     info.append("Here is a list of information about AAPL without any format")
-    
-    info.append(fetch_price(symbol))
-    info.append(fetch_news(symbol))
-    info.append(fetch_insider(symbol))
+
+    # Independent Finnhub round-trips: run them at once instead of one after another
+    price, news, insider = asyncio.run(fetch_all_async([symbol]))[symbol]
+    info.extend([price, news, insider])
 
     for item in info:
         print(item)
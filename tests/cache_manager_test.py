@@ -0,0 +1,383 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock, PropertyMock, patch
+
+from data.cache_manager import CacheManager, RELEASE_LOCK_SCRIPT
+
+
+class TestCacheManager:
+    """Test suite for the CacheManager class."""
+
+    @pytest.fixture
+    def mock_redis(self):
+        """Create a mock Redis client."""
+        client = Mock()
+        client.get.return_value = None
+        client.setex.return_value = True
+        return client
+
+    @pytest.fixture
+    def cache(self, mock_redis):
+        """Create a fresh CacheManager (bypassing the singleton) on a mock client."""
+        with patch.object(CacheManager, '_instance', None), \
+             patch('data.cache_manager.redis.Redis', return_value=mock_redis):
+            yield CacheManager()
+
+    # --- Connection Pool Tests ---
+
+    def test_pool_uses_url_by_default(self):
+        """Test that the pool is built from REDIS_URL when nothing else is set."""
+        pool = CacheManager._build_pool()
+        assert pool.max_connections == 32
+        assert pool.connection_kwargs['socket_keepalive'] is True
+
+    def test_pool_prefers_unix_socket(self):
+        """Test that REDIS_UNIX_SOCKET switches to a UNIX domain socket pool."""
+        import redis
+        with patch('data.cache_manager.REDIS_UNIX_SOCKET', '/tmp/redis.sock'):
+            pool = CacheManager._build_pool(host='localhost', port=6379)
+        assert pool.connection_class is redis.UnixDomainSocketConnection
+        assert pool.connection_kwargs['path'] == '/tmp/redis.sock'
+
+    def test_async_pool_matches_sync_pool(self):
+        """Test that the asyncio pool gets the same socket and size settings."""
+        import redis.asyncio
+        with patch('data.cache_manager.REDIS_UNIX_SOCKET', '/tmp/redis.sock'):
+            pool = CacheManager._build_pool(backend=redis.asyncio)
+        assert pool.connection_class is redis.asyncio.UnixDomainSocketConnection
+        assert pool.max_connections == 32
+
+    def test_async_client_is_per_event_loop(self, cache):
+        """Test that each event loop gets its own asyncio client."""
+        async def current():
+            return cache.async_client, cache.async_client
+
+        first, same = asyncio.run(current())
+        second, _ = asyncio.run(current())
+
+        assert first is same
+        assert first is not second
+
+    # --- L1 Cache Tests ---
+
+    def test_get_hit_is_served_from_l1(self, cache, mock_redis):
+        """Test that a repeated read skips Redis while the L1 entry is fresh."""
+        mock_redis.get.return_value = CacheManager.serialize({'vix': 20})
+
+        assert cache.get('market:AAPL') == {'vix': 20}
+        assert cache.get('market:AAPL') == {'vix': 20}
+
+        mock_redis.get.assert_called_once_with('market:AAPL')
+        assert cache._stats['hits'] == 2
+
+    def test_get_miss_is_not_stored_in_l1(self, cache, mock_redis):
+        """Test that misses always go back to Redis."""
+        cache.get('market:AAPL')
+        cache.get('market:AAPL')
+
+        assert mock_redis.get.call_count == 2
+
+    def test_l1_entry_expires(self, cache, mock_redis):
+        """Test that expired L1 entries fall through to Redis."""
+        mock_redis.get.return_value = CacheManager.serialize({'vix': 20})
+
+        with patch('data.cache_manager.time.monotonic', return_value=0.0):
+            cache.get('market:AAPL')
+        with patch('data.cache_manager.time.monotonic', return_value=60.0):
+            cache.get('market:AAPL')
+
+        assert mock_redis.get.call_count == 2
+
+    def test_set_replaces_l1_entry(self, cache, mock_redis):
+        """Test that writing a key replaces the stale L1 entry."""
+        mock_redis.get.return_value = CacheManager.serialize({'vix': 20})
+        cache.get('market:AAPL')
+
+        cache.set('market:AAPL', {'vix': 35})
+
+        assert cache.get('market:AAPL') == {'vix': 35}
+        mock_redis.get.assert_called_once()
+
+    def test_set_l1_is_not_the_callers_object(self, cache, mock_redis):
+        """Test that mutating a value after set() does not change cached reads."""
+        value = {'vix': 20}
+        cache.set('market:AAPL', value)
+        value['vix'] = 99
+
+        assert cache.get('market:AAPL') == {'vix': 20}
+        mock_redis.get.assert_not_called()
+
+    def test_set_l1_never_outlives_redis_ttl(self, cache, mock_redis):
+        """Test that write-through L1 entries expire with short Redis TTLs."""
+        with patch('data.cache_manager.time.monotonic', return_value=0.0):
+            cache.set('quote:AAPL', {'c': 1}, ttl=1)
+        with patch('data.cache_manager.time.monotonic', return_value=2.0):
+            cache.get('quote:AAPL')
+
+        mock_redis.get.assert_called_once_with('quote:AAPL')
+
+    def test_invalidate_deletes_and_publishes(self, cache, mock_redis):
+        """Test that invalidate drops L1, deletes in Redis and broadcasts the keys."""
+        cache.set('a', 1)
+
+        cache.invalidate('a', 'b')
+
+        pipe = mock_redis.pipeline.return_value
+        pipe.delete.assert_called_once_with('a', 'b', 'stale:a', 'stale:b')
+        pipe.publish.assert_any_call('cache:invalidate', 'a')
+        pipe.publish.assert_any_call('cache:invalidate', 'b')
+        assert 'a' not in cache._l1
+
+    def test_delete_invalidates_l1(self, cache, mock_redis):
+        """Test that deleting a key drops the L1 entry."""
+        mock_redis.get.return_value = CacheManager.serialize({'vix': 20})
+        cache.get('market:AAPL')
+
+        cache.delete('market:AAPL')
+        mock_redis.get.return_value = None
+
+        assert cache.get('market:AAPL') is None
+
+    def test_l1_evicts_oldest(self, cache, mock_redis):
+        """Test that the L1 cache stays bounded."""
+        mock_redis.get.return_value = CacheManager.serialize(1)
+
+        with patch('data.cache_manager.L1_MAX_ENTRIES', 2):
+            for key in ('a', 'b', 'c'):
+                cache.get(key)
+
+        assert list(cache._l1) == ['b', 'c']
+
+    def test_mget_single_round_trip(self, cache, mock_redis):
+        """Test that mget serves L1 hits locally and reads the rest in one MGET."""
+        mock_redis.get.return_value = CacheManager.serialize('warm')
+        cache.get('a')
+        mock_redis.mget.return_value = [CacheManager.serialize('b'), None]
+
+        assert cache.mget(['a', 'b', 'c']) == ['warm', 'b', None]
+        mock_redis.mget.assert_called_once_with(['b', 'c'])
+
+    # --- Serialization Tests ---
+
+    def test_serialize_round_trip(self):
+        """Test that values survive a serialize/deserialize round-trip."""
+        value = {'vix': 18.5, 'volume': {'liquidity': 'normal'}, 'macd_result': 1}
+        payload = CacheManager.serialize(value)
+
+        assert payload[:1] == b'\x01'
+        assert CacheManager.deserialize(payload) == value
+
+    def test_deserialize_legacy_json(self):
+        """Test that unversioned JSON payloads are still readable."""
+        assert CacheManager.deserialize(b'{"a": 1}') == {'a': 1}
+
+    def test_deserialize_plain_text(self):
+        """Test that non-JSON payloads come back as text."""
+        assert CacheManager.deserialize(b'not json') == 'not json'
+
+    def test_clear_pattern_invalidates_l1(self, cache, mock_redis):
+        """Test that pattern deletes also drop matching L1 entries."""
+        mock_redis.get.return_value = CacheManager.serialize(1)
+        mock_redis.scan_iter.side_effect = lambda match, count: (
+            [b'stale:market:AAPL'] if match.startswith('stale:') else [b'market:AAPL']
+        )
+        mock_redis.pipeline.return_value.execute.return_value = [1, 1, 0]
+        cache.get('market:AAPL')
+        cache.get('price:AAPL')
+
+        assert cache.clear_pattern('market:*') == 1
+
+        assert list(cache._l1) == ['price:AAPL']
+        pipe = mock_redis.pipeline.return_value
+        pipe.delete.assert_any_call(b'market:AAPL')
+        pipe.delete.assert_any_call(b'stale:market:AAPL')
+        pipe.publish.assert_called_once_with('cache:invalidate', b'market:AAPL')
+
+    # --- get_or_set Tests ---
+
+    def test_get_or_set_lock_holder_computes(self, cache, mock_redis):
+        """Test that the caller holding the lock runs the factory and releases it."""
+        mock_redis.set.return_value = True
+        factory = Mock(return_value={'vix': 20})
+
+        assert cache.get_or_set('market:AAPL', factory, ttl=60) == {'vix': 20}
+
+        factory.assert_called_once()
+        token = mock_redis.set.call_args[0][1]
+        mock_redis.set.assert_called_once_with('lock:market:AAPL', token, nx=True, ex=30)
+        mock_redis.setex.assert_any_call('market:AAPL', 60, CacheManager.serialize({'vix': 20}))
+        mock_redis.setex.assert_any_call('stale:market:AAPL', 600, CacheManager.serialize({'vix': 20}))
+        mock_redis.eval.assert_called_once_with(RELEASE_LOCK_SCRIPT, 1, 'lock:market:AAPL', token)
+        mock_redis.delete.assert_not_called()
+
+    def test_get_or_set_lock_tokens_are_unique(self, cache, mock_redis):
+        """Test that each recompute holds its own token, so it can't release another's lock."""
+        mock_redis.set.return_value = True
+
+        cache.get_or_set('market:AAPL', Mock(return_value=1))
+        cache._l1.clear()
+        cache.get_or_set('market:AAPL', Mock(return_value=1))
+
+        first, second = (call.args[1] for call in mock_redis.set.call_args_list)
+        assert first != second
+
+    def test_get_or_set_waits_for_lock_holder(self, cache, mock_redis):
+        """Test that callers without the lock wait for the other result."""
+        mock_redis.set.return_value = False
+        mock_redis.get.side_effect = [None, None, CacheManager.serialize({'vix': 20})]
+        factory = Mock()
+
+        with patch('data.cache_manager.time.sleep'):
+            assert cache.get_or_set('market:AAPL', factory) == {'vix': 20}
+
+        factory.assert_not_called()
+
+    def test_get_or_set_serves_stale_on_timeout(self, cache, mock_redis):
+        """Test that the stale copy is returned if the recompute never lands."""
+        mock_redis.set.return_value = False
+        stale = CacheManager.serialize({'vix': 18})
+        mock_redis.get.side_effect = lambda key: stale if key.startswith('stale:') else None
+        factory = Mock()
+
+        assert cache.get_or_set('market:AAPL', factory, wait_timeout=0) == {'vix': 18}
+        factory.assert_not_called()
+
+    def test_aget_or_set_lock_holder_computes(self, cache):
+        """Test that the async path takes the lock and writes the stale copy."""
+        client = AsyncMock()
+        client.mget.return_value = [None]
+        client.set.return_value = True
+        client.pipeline = Mock()
+        client.pipeline.return_value.execute = AsyncMock()
+        factory = AsyncMock(return_value={'vix': 20})
+
+        with patch.object(CacheManager, 'async_client', new_callable=PropertyMock, return_value=client):
+            assert asyncio.run(cache.aget_or_set('market:AAPL', factory, ttl=60)) == {'vix': 20}
+
+        token = client.set.await_args[0][1]
+        client.set.assert_awaited_once_with('lock:market:AAPL', token, nx=True, ex=30)
+        pipe = client.pipeline.return_value
+        pipe.setex.assert_any_call('market:AAPL', 60, CacheManager.serialize({'vix': 20}))
+        pipe.setex.assert_any_call('stale:market:AAPL', 600, CacheManager.serialize({'vix': 20}))
+        client.eval.assert_awaited_once_with(RELEASE_LOCK_SCRIPT, 1, 'lock:market:AAPL', token)
+        assert cache._l1['market:AAPL'][1] == {'vix': 20}
+
+    def test_aget_or_set_matches_sync_ttl_and_l1_copy(self, cache):
+        """Test that the async path resolves a callable ttl and caches a copy in L1."""
+        client = AsyncMock()
+        client.mget.return_value = [None]
+        client.set.return_value = True
+        client.pipeline = Mock()
+        client.pipeline.return_value.execute = AsyncMock()
+        value = {'vix': 20}
+
+        async def factory():
+            return value
+
+        with patch.object(CacheManager, 'async_client', new_callable=PropertyMock, return_value=client):
+            asyncio.run(cache.aget_or_set('shared:regime:AAPL', factory, ttl=lambda: 42))
+        value['vix'] = 99
+
+        client.pipeline.return_value.setex.assert_any_call(
+            'shared:regime:AAPL', 42, CacheManager.serialize({'vix': 20})
+        )
+        assert cache.get('shared:regime:AAPL') == {'vix': 20}
+
+    def test_amget_serves_l1_and_fetches_the_rest(self, cache):
+        """Test that the async mget only asks Redis for keys missing from L1."""
+        client = AsyncMock()
+        client.mget.return_value = [CacheManager.serialize({'vix': 22})]
+        cache._l1_store('market:AAPL', {'vix': 12})
+
+        with patch.object(CacheManager, 'async_client', new_callable=PropertyMock, return_value=client):
+            values = asyncio.run(cache.amget(['market:AAPL', 'market:MSFT']))
+
+        assert values == [{'vix': 12}, {'vix': 22}]
+        client.mget.assert_awaited_once_with(['market:MSFT'])
+
+    def test_get_or_set_ttl_can_be_computed_after_factory(self, cache, mock_redis):
+        """Test that a callable ttl is resolved once the value has been computed."""
+        mock_redis.set.return_value = True
+        calls = []
+        factory = Mock(side_effect=lambda: calls.append('factory') or 'BULL_TREND')
+        ttl = Mock(side_effect=lambda: calls.append('ttl') or 42)
+
+        cache.get_or_set('shared:regime:AAPL', factory, ttl=ttl)
+
+        assert calls == ['factory', 'ttl']
+        mock_redis.setex.assert_any_call('shared:regime:AAPL', 42, CacheManager.serialize('BULL_TREND'))
+
+    # --- Statistics Tests ---
+
+    def test_get_stats_uses_dbsize(self, cache, mock_redis):
+        """Test that total_keys comes from DBSIZE rather than KEYS."""
+        mock_redis.dbsize.return_value = 42
+        mock_redis.hgetall.return_value = {}
+
+        stats = cache.get_stats()
+
+        assert stats['total_keys'] == 42
+        mock_redis.keys.assert_not_called()
+
+
+    def test_get_stats_reads_shared_counters(self, cache, mock_redis):
+        """Test that stats are flushed and read back from the Redis hash."""
+        mock_redis.hgetall.return_value = {b'hits': b'3', b'misses': b'1'}
+        cache.get('market:AAPL')
+
+        stats = cache.get_stats()
+
+        mock_redis.pipeline.return_value.hincrby.assert_called_once_with('cache:stats', 'misses', 1)
+        assert stats['hits'] == 3
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 0.75
+
+    def test_counters_flush_in_batches(self, cache, mock_redis):
+        """Test that counters are only pushed to Redis every STATS_FLUSH_EVERY ops."""
+        with patch('data.cache_manager.STATS_FLUSH_EVERY', 3):
+            cache.get('a')
+            cache.get('b')
+            mock_redis.pipeline.assert_not_called()
+            cache.get('c')
+
+        mock_redis.pipeline.return_value.hincrby.assert_called_once_with('cache:stats', 'misses', 3)
+        assert cache._stats == {'hits': 0, 'misses': 0}
+
+class TestSharedMarketCache:
+    """Test suite for the SharedMarketCache facade."""
+
+    @pytest.fixture
+    def shared(self):
+        """Create a SharedMarketCache over a mock CacheManager."""
+        from data.cache_manager import SharedMarketCache
+        return SharedMarketCache(Mock())
+
+    def test_key_is_normalized(self, shared):
+        """Test that all spellings of a symbol share one key."""
+        assert shared.key(' amzn ') == 'shared:market:AMZN'
+
+    def test_get_or_set_uses_shared_key(self, shared):
+        """Test that reads go through the shared namespace."""
+        factory = Mock()
+        shared.get_or_set('aapl', factory, ttl=60)
+        shared.cache.get_or_set.assert_called_once_with('shared:market:AAPL', factory, ttl=60)
+
+    def test_regime_ttl_follows_market_entry(self, shared):
+        """Test that the regime never outlives the market entry it came from."""
+        shared.cache.get_ttl.return_value = 17
+        shared.get_or_set_regime('aapl', Mock(), ttl=60)
+
+        key, _ = shared.cache.get_or_set.call_args[0]
+        ttl = shared.cache.get_or_set.call_args[1]['ttl']
+        assert key == 'shared:regime:AAPL'
+        assert ttl() == 17
+        shared.cache.get_ttl.assert_called_once_with('shared:market:AAPL')
+
+        shared.cache.get_ttl.return_value = -2
+        assert ttl() == 60
+
+    def test_invalidate_uses_the_shared_channel(self, shared):
+        """Test that both keys go through CacheManager.invalidate (one channel, one listener)."""
+        shared.invalidate('aapl')
+
+        shared.cache.invalidate.assert_called_once_with('shared:market:AAPL', 'shared:regime:AAPL')
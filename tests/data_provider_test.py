@@ -1,33 +1,39 @@
 import pytest
 import time
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
+
+
+@pytest.fixture(scope="module")
+def mock_finnhub_client():
+    """Create a mock Finnhub client shared by the module (reset per test)."""
+    return Mock()
+
+
+@pytest.fixture(scope="module")
+def mock_cache_manager():
+    """Create a mock CacheManager shared by the module (reset per test)."""
+    return Mock()
 
 
 class TestDataProvider:
     """Test suite for the DataProvider class."""
 
-    @pytest.fixture
-    def mock_finnhub_client(self):
-        """Create a mock Finnhub client."""
-        return Mock()
-
-    @pytest.fixture
-    def mock_cache_manager(self):
-        """Create a mock CacheManager."""
-        cache = Mock()
-        cache.get.return_value = None  # Default to cache miss
-        cache.set.return_value = True
-        return cache
+    @pytest.fixture(autouse=True)
+    def _reset_mocks(self, mock_finnhub_client, mock_cache_manager):
+        """Clear calls and configured results, then restore the cache-miss defaults."""
+        mock_finnhub_client.reset_mock(return_value=True, side_effect=True)
+        mock_cache_manager.reset_mock(return_value=True, side_effect=True)
+        mock_cache_manager.get.return_value = None  # Default to cache miss
+        mock_cache_manager.mget.side_effect = lambda keys: [None] * len(keys)
+        mock_cache_manager.set.return_value = True
 
     @pytest.fixture
     def data_provider(self, mock_finnhub_client, mock_cache_manager):
         """Create a DataProvider instance with mocked dependencies."""
-        with patch('data.data_provider.finnhub_client', mock_finnhub_client), \
-             patch('data.data_provider.CacheManager', return_value=mock_cache_manager):
-            from data.data_provider import DataProvider
-            provider = DataProvider(cache_manager=mock_cache_manager)
-            provider.finnhub_client = mock_finnhub_client
-            return provider
+        from data.data_provider import DataProvider
+        provider = DataProvider(cache_manager=mock_cache_manager)
+        provider.finnhub_client = mock_finnhub_client
+        return provider
 
     # --- Initialization Tests ---
 
@@ -61,6 +67,10 @@ class TestDataProvider:
         """Test that whitespace is stripped from symbols."""
         assert data_provider._validate_symbol('  AAPL  ') == 'AAPL'
 
+    def test_validate_symbol_is_interned(self, data_provider):
+        """Test that every spelling of a ticker normalizes to the same object."""
+        assert data_provider._validate_symbol(' aapl') is data_provider._validate_symbol('AAPL ')
+
     def test_validate_symbol_empty_raises(self, data_provider):
         """Test that empty symbol raises ValueError."""
         with pytest.raises(ValueError):
@@ -71,37 +81,51 @@ class TestDataProvider:
         with pytest.raises(ValueError):
             data_provider._validate_symbol(None)
 
-    # --- fetch_price Tests (No Cache) ---
+    # --- get_price Tests (Short Cache) ---
 
-    def test_fetch_price_returns_data(self, data_provider, mock_finnhub_client):
-        """Test that fetch_price returns quote data."""
+    def test_get_price_miss_returns_quote(self, data_provider, mock_finnhub_client):
+        """Test that a cache miss returns the quote from the API."""
         expected = {'c': 150.0, 'h': 152.0, 'l': 148.0, 'o': 149.0}
         mock_finnhub_client.quote.return_value = expected
 
-        result = data_provider.fetch_price('AAPL')
+        result = data_provider.get_price('AAPL')
 
         assert result == expected
         mock_finnhub_client.quote.assert_called_once_with('AAPL')
 
-    def test_fetch_price_increments_api_calls(self, data_provider, mock_finnhub_client):
-        """Test that fetch_price increments API call count."""
+    def test_get_price_miss_increments_api_calls(self, data_provider, mock_finnhub_client):
+        """Test that a cache miss counts one API call."""
         mock_finnhub_client.quote.return_value = {}
 
-        data_provider.fetch_price('AAPL')
+        data_provider.get_price('AAPL')
 
         assert data_provider.stats['api_calls'] == 1
 
-    # --- fetch_current_price Tests ---
-
-    def test_fetch_current_price_returns_float(self, data_provider, mock_finnhub_client):
-        """Test that fetch_current_price returns just the current price."""
+    def test_get_current_price_returns_float(self, data_provider, mock_finnhub_client):
+        """Test that get_current_price returns just the current price."""
         mock_finnhub_client.quote.return_value = {'c': 150.25, 'h': 152.0}
 
-        result = data_provider.fetch_current_price('AAPL')
+        result = data_provider.get_current_price('AAPL')
 
         assert result == 150.25
         assert isinstance(result, float)
 
+    def test_get_price_cache_hit(self, data_provider, mock_cache_manager, mock_finnhub_client):
+        """Test that a cached quote is served without an API call."""
+        mock_cache_manager.get.return_value = {'c': 150.0}
+
+        assert data_provider.get_current_price('AAPL') == 150.0
+        mock_cache_manager.get.assert_called_once_with('finnhub:quote:AAPL')
+        mock_finnhub_client.quote.assert_not_called()
+
+    def test_get_price_uses_short_jittered_ttl(self, data_provider, mock_finnhub_client, mock_cache_manager):
+        """Test that quotes are cached for roughly 10 seconds."""
+        mock_finnhub_client.quote.return_value = {'c': 150.0}
+
+        data_provider.get_price('AAPL')
+
+        assert 8 <= mock_cache_manager.set.call_args[1]['ttl'] <= 12
+
     # --- get_basic_financials Tests (Cached) ---
 
     def test_get_financials_cache_hit(self, data_provider, mock_cache_manager, mock_finnhub_client):
@@ -129,6 +153,44 @@ class TestDataProvider:
         assert data_provider.stats['cache_misses'] == 1
         assert data_provider.stats['api_calls'] == 1
 
+    def test_concurrent_misses_share_one_fetch(self, data_provider, mock_cache_manager, mock_finnhub_client):
+        """Test that concurrent misses on one key make a single API call."""
+        import threading
+        release = threading.Event()
+
+        def slow_fetch(**kwargs):
+            release.wait(timeout=5)
+            return {'metric': {}}
+
+        mock_finnhub_client.company_basic_financials.side_effect = slow_fetch
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(data_provider.get_basic_financials('AAPL')))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        # Every caller has missed the cache before the leader's fetch completes
+        while mock_cache_manager.get.call_count < 4:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == [{'metric': {}}] * 4
+        mock_finnhub_client.company_basic_financials.assert_called_once()
+        assert data_provider._inflight == {}
+
+    def test_new_leader_rechecks_cache_before_fetching(self, data_provider, mock_cache_manager, mock_finnhub_client):
+        """Test that a caller who missed just before the previous leader stored the value doesn't refetch."""
+        mock_cache_manager.get.side_effect = [None, {'metric': {}}]
+
+        assert data_provider.get_basic_financials('AAPL') == {'metric': {}}
+
+        mock_finnhub_client.company_basic_financials.assert_not_called()
+        assert data_provider._inflight == {}
+
     # --- get_company_profile Tests ---
 
     def test_get_profile_uses_week_cache(self, data_provider, mock_cache_manager, mock_finnhub_client):
@@ -161,46 +223,41 @@ class TestDataProvider:
 
     # --- Rate Limiting Tests ---
 
-    def test_rate_limiter_adds_timestamp(self, data_provider):
-        """Test that rate limiter adds timestamp."""
+    def test_rate_limiter_consumes_token(self, data_provider):
+        """Test that each call consumes one token."""
         data_provider._check_rate_limit()
-        assert len(data_provider.api_call_times) == 1
+        assert data_provider._tokens == pytest.approx(59, abs=0.01)
 
-    def test_rate_limiter_cleans_old_timestamps(self, data_provider):
-        """Test that old timestamps are cleaned up."""
-        # Add old timestamp (70 seconds ago)
-        old_time = time.time() - 70
-        data_provider.api_call_times.append(old_time)
+    def test_rate_limiter_refills_over_time(self, data_provider):
+        """Test that tokens are refilled at requests_per_minute / 60 per second."""
+        data_provider._tokens = 0.0
+        data_provider._last_refill = time.monotonic() - 30
 
         data_provider._check_rate_limit()
 
-        # Old timestamp should be removed, only new one present
-        assert len(data_provider.api_call_times) == 1
-        assert data_provider.api_call_times[0] > old_time
+        # 30 seconds at 1 token/second, minus the one just consumed
+        assert data_provider._tokens == pytest.approx(29, abs=0.1)
 
-    def test_rate_limiter_keeps_recent_timestamps(self, data_provider):
-        """Test that timestamps within 60 seconds are kept."""
-        recent_time = time.time() - 30
-        data_provider.api_call_times.append(recent_time)
+    def test_rate_limiter_caps_at_capacity(self, data_provider):
+        """Test that an idle bucket never holds more than requests_per_minute tokens."""
+        data_provider._last_refill = time.monotonic() - 3600
 
         data_provider._check_rate_limit()
 
-        # Recent timestamp should be kept, plus new one
-        assert len(data_provider.api_call_times) == 2
+        assert data_provider._tokens == pytest.approx(59, abs=0.01)
 
     def test_rate_limiter_waits_at_limit(self, data_provider):
-        """Test that rate limiter waits when at limit."""
-        data_provider.requests_per_minute = 3  # Low limit for testing
-
-        # Fill up with recent timestamps
-        now = time.time()
-        for i in range(3):
-            data_provider.api_call_times.append(now - i)
+        """Test that rate limiter waits when the bucket is empty."""
+        data_provider.requests_per_minute = 3  # 1 token every 20 seconds
+        data_provider._tokens = 0.0
+        data_provider._last_refill = time.monotonic()
 
         with patch('data.data_provider.time.sleep') as mock_sleep:
             data_provider._check_rate_limit()
-            # Should have called sleep or incremented rate_limit_waits
-            assert mock_sleep.called or data_provider.stats['rate_limit_waits'] >= 0
+
+        wait_time = mock_sleep.call_args[0][0]
+        assert wait_time == pytest.approx(20, abs=0.1)
+        assert data_provider.stats['rate_limit_waits'] == 1
 
     # --- Statistics Tests ---
 
@@ -224,6 +281,29 @@ class TestDataProvider:
         stats = data_provider.get_statistics()
         assert stats['cache_hit_rate'] == 0.0
 
+    def test_cache_hit_rate_property(self, data_provider):
+        """Test that the hit rate is readable without building the stats dict."""
+        data_provider.stats['cache_hits'] = 3
+        data_provider.stats['cache_misses'] = 1
+
+        assert data_provider.cache_hit_rate == 0.75
+        assert data_provider.get_statistics()['cache_hit_rate'] == 0.75
+
+    def test_counters_are_thread_safe(self, data_provider):
+        """Test that concurrent increments from worker threads are not lost."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        def bump(_):
+            for _ in range(1000):
+                data_provider._count('api_calls')
+                data_provider._track_error('TimeoutError')
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(bump, range(8)))
+
+        assert data_provider.stats['api_calls'] == 8000
+        assert data_provider.stats['errors']['TimeoutError'] == 8000
+
     # --- get_all_data Tests ---
 
     def test_get_all_data_returns_dict(self, data_provider, mock_finnhub_client, mock_cache_manager):
@@ -264,6 +344,290 @@ class TestDataProvider:
         assert result['financials'] is None  # Failed
         assert result['company_profile'] == {'name': 'Apple'}
 
+    def test_finnhub_client_still_has_a_requests_session(self):
+        """Test that finnhub-python still keeps the private session we pool; fails on an upgrade that drops it."""
+        import finnhub
+        import requests
+
+        client = finnhub.Client(api_key='test')
+
+        assert isinstance(getattr(client, '_session', None), requests.Session), (
+            "finnhub.Client no longer has a requests _session; update mount_finnhub_pool and the version pin"
+        )
+
+    def test_finnhub_session_uses_pooled_adapter(self):
+        """Test that the shared Finnhub client routes https through the sized adapter."""
+        from data.data_provider import finnhub_client, _http_adapter
+
+        assert finnhub_client._session.get_adapter('https://api.finnhub.io') is _http_adapter
+
+    def test_mount_finnhub_pool_tolerates_missing_session(self):
+        """Test that a client without a requests session is left unpooled instead of crashing."""
+        from data.data_provider import mount_finnhub_pool
+
+        assert mount_finnhub_pool(object(), Mock()) is False
+
+    def test_invalidate_evicts_symbol_keys(self, data_provider, mock_cache_manager):
+        """Test that invalidation drops the keys everywhere and forgets XFetch metadata."""
+        data_provider._xfetch['finnhub:quote:AAPL'] = (0.0, 0.1)
+
+        data_provider.invalidate('aapl', 'quote', 'profile')
+
+        mock_cache_manager.invalidate.assert_called_once_with('finnhub:quote:AAPL', 'finnhub:profile:AAPL')
+        assert 'finnhub:quote:AAPL' not in data_provider._xfetch
+
+    def test_trade_message_evicts_quotes_once_per_symbol(self, data_provider, mock_cache_manager):
+        """Test that a trade batch evicts each traded symbol's quote once."""
+        data_provider._on_trade_message(
+            b'{"type": "trade", "data": [{"s": "AAPL", "p": 1}, {"s": "AAPL", "p": 2}, {"s": "MSFT", "p": 3}]}'
+        )
+        data_provider._on_trade_message(b'{"type": "ping"}')
+
+        evicted = sorted(call.args for call in mock_cache_manager.invalidate.call_args_list)
+        assert evicted == [('finnhub:quote:AAPL',), ('finnhub:quote:MSFT',)]
+
+    def test_trade_message_evicts_at_most_once_per_quote_ttl(self, data_provider, mock_cache_manager):
+        """Test that a busy symbol's quote is not evicted on every trade."""
+        message = b'{"type": "trade", "data": [{"s": "AAPL", "p": 1}]}'
+        ttl = data_provider.cache_ttl['quote']
+
+        with patch('data.data_provider.time.monotonic', return_value=100.0):
+            data_provider._on_trade_message(message)
+            data_provider._on_trade_message(message)
+        with patch('data.data_provider.time.monotonic', return_value=100.0 + ttl):
+            data_provider._on_trade_message(message)
+
+        assert mock_cache_manager.invalidate.call_count == 2
+
+    def test_raw_history_parses_chart_json(self, data_provider):
+        """Test that Yahoo chart JSON becomes NumPy arrays with empty bars dropped."""
+        body = (b'{"chart": {"result": [{"timestamp": [1, 2, 3], "indicators": {"quote": [{'
+                b'"open": [1.0, null, 3.0], "high": [2.0, null, 4.0], "low": [0.5, null, 2.5], '
+                b'"close": [1.5, null, 3.5], "volume": [100, null, 300]}]}}]}}')
+
+        with patch('data.data_provider.yahoo_session') as session:
+            mock_get = session.return_value.get
+            mock_get.return_value.content = body
+            bars = data_provider.raw_history('aapl')
+
+        assert mock_get.call_args[0][0].endswith('/chart/AAPL')
+        assert mock_get.call_args[1]['params'] == {'range': '1y', 'interval': '1d'}
+        assert bars['close'].tolist() == [1.5, 3.5]
+        assert bars['volume'].tolist() == [100.0, 300.0]
+        assert bars['timestamp'].tolist() == [1.0, 3.0]
+
+    def test_yahoo_session_is_per_thread(self):
+        """Test that each thread gets its own Yahoo session and keeps reusing it."""
+        import threading
+        from data.data_provider import yahoo_session
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(yahoo_session()))
+        thread.start()
+        thread.join()
+
+        assert yahoo_session() is yahoo_session()
+        assert other[0] is not yahoo_session()
+
+    def test_interact_anthropic_streams_with_cached_system_prompt(self, data_provider):
+        """Test that replies are streamed and the system prompt is cache-marked."""
+        client = MagicMock()
+        stream = client.messages.stream.return_value.__enter__.return_value
+        stream.text_stream = iter(['Hel', 'lo'])
+        data_provider.anthropic_client = client
+
+        assert ''.join(data_provider.interact_anthropic('hi')) == 'Hello'
+
+        system = client.messages.stream.call_args.kwargs['system']
+        assert system[0]['cache_control'] == {'type': 'ephemeral'}
+
+    def test_warm_prefetches_long_ttl_endpoints(self, data_provider, mock_finnhub_client):
+        """Test that warm fetches financials, profile and peers per symbol."""
+        mock_finnhub_client.company_peers.side_effect = Exception("down")
+
+        warmed = data_provider.warm(['AAPL', 'MSFT'])
+
+        assert warmed == 4
+        assert mock_finnhub_client.company_basic_financials.call_count == 2
+        assert mock_finnhub_client.company_profile2.call_count == 2
+        mock_finnhub_client.quote.assert_not_called()
+
+    def test_get_all_data_many_bounds_concurrency(self, data_provider):
+        """Test that the async fan-out returns per-symbol results within the limit."""
+        import asyncio
+        import threading
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def fake_get_all_data(symbol, from_date, to_date):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return {'symbol': symbol}
+
+        symbols = ['AAPL', 'MSFT', 'GOOG', 'AMZN', 'NVDA', 'META']
+        with patch.object(data_provider, 'get_all_data', side_effect=fake_get_all_data), \
+             patch('data.data_provider.MARKET_FETCH_CONCURRENCY', 2):
+            result = asyncio.run(data_provider.get_all_data_many(symbols, '2024-01-01', '2024-01-07'))
+
+        assert result == {symbol: {'symbol': symbol} for symbol in symbols}
+        assert peak[0] <= 2
+
+    def test_cache_hit_near_expiry_refreshes_in_background(self, data_provider, mock_cache_manager):
+        """Test that XFetch serves the cached value and refreshes it off-thread."""
+        mock_cache_manager.get.return_value = {'c': 1}
+        data_provider._xfetch['k'] = (time.monotonic() + 0.5, 0.5)
+        fetch = Mock(return_value={'c': 2})
+
+        with patch('data.data_provider.random.random', return_value=0.99):
+            assert data_provider._fetch_with_cache('k', fetch, ttl=60) == {'c': 1}
+
+        deadline = time.time() + 1
+        while fetch.call_count == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        fetch.assert_called_once()
+        mock_cache_manager.set.assert_called_once_with('k', {'c': 2}, ttl=60)
+
+    def test_cache_hit_far_from_expiry_does_not_refresh(self, data_provider, mock_cache_manager):
+        """Test that fresh entries are served without an early refresh."""
+        mock_cache_manager.get.return_value = {'c': 1}
+        data_provider._xfetch['k'] = (time.monotonic() + 3600, 0.5)
+        fetch = Mock()
+
+        assert data_provider._fetch_with_cache('k', fetch, ttl=60) == {'c': 1}
+        fetch.assert_not_called()
+
+    def test_xfetch_bookkeeping_is_bounded(self, data_provider):
+        """Test that date-keyed entries can't grow the XFetch table without limit."""
+        with patch('data.data_provider.XFETCH_MAX_KEYS', 2):
+            for day in range(3):
+                data_provider._remember_fetch(f'finnhub:insiders:AAPL:2024-01-0{day}', 60, 0.1)
+
+        assert list(data_provider._xfetch) == ['finnhub:insiders:AAPL:2024-01-01', 'finnhub:insiders:AAPL:2024-01-02']
+
+    def test_expired_xfetch_entry_is_dropped(self, data_provider):
+        """Test that an entry past its expiry is pruned instead of kept forever."""
+        data_provider._xfetch['k'] = (time.monotonic() - 1, 0.5)
+
+        assert data_provider._should_refresh_early('k') is False
+        assert 'k' not in data_provider._xfetch
+
+    @staticmethod
+    def _api_error(status_code, headers=None):
+        """Build a FinnhubAPIException for the given HTTP status."""
+        import finnhub
+        response = Mock(status_code=status_code, headers=headers or {})
+        response.json.return_value = {'error': 'boom'}
+        return finnhub.FinnhubAPIException(response)
+
+    def test_retry_honors_retry_after(self, data_provider):
+        """Test that a 429 with Retry-After waits exactly that long."""
+        fetch = Mock(side_effect=[self._api_error(429, {'Retry-After': '2'}), {'ok': True}])
+
+        with patch('data.data_provider.time.sleep') as mock_sleep:
+            assert data_provider._fetch_from_api('k', fetch, ttl=0) == {'ok': True}
+
+        mock_sleep.assert_called_once_with(2.0)
+
+    def test_retry_uses_capped_full_jitter(self, data_provider):
+        """Test that server errors sleep a random amount within the capped backoff."""
+        fetch = Mock(side_effect=[self._api_error(503), self._api_error(503), {'ok': True}])
+
+        with patch('data.data_provider.time.sleep') as mock_sleep, \
+             patch('data.data_provider.random.uniform', side_effect=lambda low, high: high / 2) as mock_uniform:
+            data_provider._fetch_from_api('k', fetch, ttl=0)
+
+        assert [c.args for c in mock_uniform.call_args_list] == [(0, 2), (0, 4)]
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [1.0, 2.0]
+
+    def test_retry_gives_up_past_total_delay_cap(self, data_provider):
+        """Test that retries stop once the sleep budget would be exceeded."""
+        import finnhub
+        fetch = Mock(side_effect=self._api_error(429, {'Retry-After': '20'}))
+
+        with patch('data.data_provider.time.sleep') as mock_sleep, \
+             pytest.raises(finnhub.FinnhubAPIException):
+            data_provider._fetch_from_api('k', fetch, ttl=0)
+
+        mock_sleep.assert_called_once_with(20.0)
+
+    def test_get_all_data_reads_cache_in_one_call(self, data_provider, mock_finnhub_client, mock_cache_manager):
+        """Test that warm endpoints come from one MGET and only misses are fetched."""
+        def mget(keys):
+            return [{'cached': key} if 'peers' not in key else None for key in keys]
+
+        mock_cache_manager.mget.side_effect = mget
+        mock_finnhub_client.company_peers.return_value = ['MSFT']
+
+        result = data_provider.get_all_data('AAPL', '2024-01-01', '2024-01-07')
+
+        mock_cache_manager.mget.assert_called_once()
+        assert result['price'] == {'cached': 'finnhub:quote:AAPL'}
+        assert result['insider_transactions'] == {'cached': 'finnhub:insiders:AAPL:2024-01-01:2024-01-07'}
+        assert result['company_peers'] == ['MSFT']
+        mock_finnhub_client.quote.assert_not_called()
+        mock_finnhub_client.company_peers.assert_called_once_with('AAPL')
+        assert data_provider.stats['cache_hits'] == 6
+
+    def test_get_all_data_fetches_concurrently(self, data_provider, mock_finnhub_client, mock_cache_manager):
+        """Test that get_all_data runs the endpoints at the same time."""
+        import threading
+        barrier = threading.Barrier(7, timeout=5)
+
+        def arrive(*args, **kwargs):
+            barrier.wait()
+            return {}
+
+        mock_cache_manager.get.return_value = None
+        for endpoint in ('quote', 'company_basic_financials', 'recommendation_trends',
+                         'stock_insider_transactions', 'stock_insider_sentiment',
+                         'company_profile2', 'company_peers'):
+            getattr(mock_finnhub_client, endpoint).side_effect = arrive
+
+        result = data_provider.get_all_data('AAPL', '2024-01-01', '2024-01-07')
+
+        assert list(result) == ['price', 'financials', 'recommendations', 'insider_transactions',
+                                'insider_sentiment', 'company_profile', 'company_peers']
+        assert all(value == {} for value in result.values())
+
+    def test_get_all_data_as_bytes_round_trips(self, data_provider, mock_finnhub_client):
+        """Test that the bytes fast-path decodes back to the dict result."""
+        from data.cache_manager import CacheManager
+        for endpoint in ('company_basic_financials', 'recommendation_trends', 'stock_insider_transactions',
+                         'stock_insider_sentiment', 'company_profile2', 'company_peers'):
+            getattr(mock_finnhub_client, endpoint).return_value = {}
+        mock_finnhub_client.quote.return_value = {'c': 150}
+
+        payload = data_provider.get_all_data('AAPL', '2024-01-01', '2024-01-07', as_bytes=True)
+
+        assert isinstance(payload, bytes)
+        assert CacheManager.deserialize(payload)['price'] == {'c': 150}
+
+    def test_get_all_data_bulk_groups_by_symbol(self, data_provider, mock_finnhub_client, mock_cache_manager):
+        """Test that many symbols share one MGET and results are grouped per symbol."""
+        mock_finnhub_client.quote.side_effect = lambda symbol: {'symbol': symbol}
+
+        result = data_provider.get_all_data_bulk(['aapl', 'MSFT', 'AAPL'], '2024-01-01', '2024-01-07')
+
+        assert list(result) == ['AAPL', 'MSFT']
+        assert result['MSFT']['price'] == {'symbol': 'MSFT'}
+        assert list(result['AAPL']) == list(result['MSFT'])
+        mock_cache_manager.mget.assert_called_once()
+        assert len(mock_cache_manager.mget.call_args[0][0]) == 14
+
+    def test_get_all_data_bulk_workers_outlive_the_batch(self, data_provider, mock_finnhub_client):
+        """Test that misses run on long-lived threads, so their sessions stay warm."""
+        import threading
+        workers = []
+        mock_finnhub_client.quote.side_effect = lambda symbol: workers.append(threading.current_thread())
+
+        data_provider.get_all_data_bulk(['AAPL'], '2024-01-01', '2024-01-07')
+
+        assert workers and all(thread.is_alive() for thread in workers)
+
     # --- Error Tracking Tests ---
 
     def test_error_tracking(self, data_provider):
@@ -300,16 +664,18 @@ class TestDataProviderIntegration:
         # Should complete almost instantly (less than 1 second)
         assert elapsed < 1.0
 
-    def test_timestamp_precision(self, data_provider_low_limit):
-        """Test that timestamps are recorded with sufficient precision."""
+    def test_concurrent_callers_never_overshoot(self, data_provider_low_limit):
+        """Test that concurrent callers reserve distinct tokens."""
+        import threading
         provider = data_provider_low_limit
 
-        provider._check_rate_limit()
-        time.sleep(0.1)
-        provider._check_rate_limit()
-
-        # Timestamps should be different
-        assert provider.api_call_times[0] != provider.api_call_times[1]
-        # Second timestamp should be ~0.1 seconds later
-        diff = provider.api_call_times[1] - provider.api_call_times[0]
-        assert 0.05 < diff < 0.2
+        with patch('data.data_provider.time.sleep') as mock_sleep:
+            threads = [threading.Thread(target=provider._check_rate_limit) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        # 5 tokens in the bucket, so exactly 3 callers had to wait
+        assert mock_sleep.call_count == 3
+        assert provider.stats['rate_limit_waits'] == 3
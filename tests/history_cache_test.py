@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+from data.history_cache import FileCache
+
+
+class TestFileCache:
+    """Test suite for the FileCache class."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Create a FileCache rooted in a temporary directory."""
+        return FileCache(root=str(tmp_path), ttl=60)
+
+    @pytest.fixture
+    def history(self):
+        """A small OHLCV frame."""
+        return pd.DataFrame({'Close': [100.0, 101.0], 'Volume': [10.0, 12.0]})
+
+    def test_round_trip(self, cache, history):
+        """Test that a stored frame is returned while fresh."""
+        cache.set('aapl', '1y', history)
+
+        pd.testing.assert_frame_equal(cache.get('AAPL', '1y'), history)
+
+    def test_missing_entry(self, cache):
+        """Test that an unknown key is a miss."""
+        assert cache.get('AAPL', '1y') is None
+
+    def test_expired_entry(self, cache, history):
+        """Test that entries older than the TTL are misses."""
+        with patch('data.history_cache.time.time', return_value=1000.0):
+            cache.set('AAPL', '1y', history)
+        with patch('data.history_cache.time.time', return_value=1060.0):
+            assert cache.get('AAPL', '1y') is None
+
+    def test_interval_is_part_of_key(self, cache, history):
+        """Test that different bar intervals do not collide."""
+        cache.set('AAPL', '1y', history, interval='1d')
+        assert cache.get('AAPL', '1y', interval='1h') is None
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import Mock, patch
+
+from data import _indicators_nb
+
+
+class TestIndicatorKernels:
+    """Test that the single-pass kernels match the NumPy implementations."""
+
+    @pytest.fixture
+    def calculator(self):
+        """Create a MarketCalculator with mocked dependencies."""
+        from data.market_calculator import MarketCalculator
+        return MarketCalculator(provider=Mock(), cache=Mock(), history_cache=Mock())
+
+    @pytest.fixture
+    def history(self):
+        """A random-walk OHLCV frame."""
+        rng = np.random.default_rng(3)
+        close = np.round(100 + rng.normal(0, 1, 250).cumsum(), 1)
+        return pd.DataFrame({
+            'Close': close,
+            'High': close + rng.uniform(0, 2, 250),
+            'Low': close - rng.uniform(0, 2, 250),
+            'Volume': rng.integers(1_000, 2_000, 250).astype(float),
+        })
+
+    @pytest.mark.parametrize('method', ['calculate_rsi', 'calculate_adx'])
+    def test_kernel_matches_numpy(self, calculator, history, method):
+        """Test that RSI and ADX agree between the two code paths."""
+        with patch.object(_indicators_nb, 'HAVE_NUMBA', False):
+            expected = getattr(calculator, method)(history)
+        with patch.object(_indicators_nb, 'HAVE_NUMBA', True):
+            actual = getattr(calculator, method)(history)
+
+        assert actual == pytest.approx(expected)
+
+    def test_obv_kernel_matches_numpy(self, calculator, history):
+        """Test that OBV agrees between the two code paths."""
+        with patch.object(_indicators_nb, 'HAVE_NUMBA', False):
+            expected = calculator.calculate_obv(history.tail(63))
+        with patch.object(_indicators_nb, 'HAVE_NUMBA', True):
+            actual = calculator.calculate_obv(history.tail(63))
+
+        assert actual['obv'] == pytest.approx(expected['obv'])
+        assert actual['obv_ma'] == pytest.approx(expected['obv_ma'])
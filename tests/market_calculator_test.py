@@ -0,0 +1,370 @@
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import Mock, patch
+
+from data.data_provider import yahoo_session
+
+
+class TestMarketCalculator:
+    """Test suite for the MarketCalculator class."""
+
+    @pytest.fixture
+    def calculator(self):
+        """Create a MarketCalculator with mocked cache and data provider."""
+        with patch('data.market_calculator.cache_manager.CacheManager'), \
+             patch('data.market_calculator.data_provider.DataProvider', return_value=Mock()):
+            from data.market_calculator import MarketCalculator, _session_ticker
+            _session_ticker.cache_clear()
+            history_cache = Mock()
+            history_cache.get.return_value = None
+            calculator = MarketCalculator(history_cache=history_cache)
+        calculator.cache_manager.get.return_value = None
+        calculator.cache_manager.mget.side_effect = lambda keys: [None] * len(keys)
+        return calculator
+
+    def test_injected_provider_is_used(self):
+        """Test that a shared DataProvider can be passed in instead of built."""
+        from data.market_calculator import MarketCalculator
+        provider, cache = Mock(), Mock()
+
+        with patch('data.market_calculator.data_provider.DataProvider') as provider_cls:
+            calculator = MarketCalculator(provider=provider, cache=cache)
+
+        provider_cls.assert_not_called()
+        assert calculator.data_provider is provider
+        assert calculator.cache_manager is cache
+
+    def test_get_history_prefers_disk_cache(self, calculator):
+        """Test that a fresh disk entry skips the yfinance download."""
+        cached = pd.DataFrame({'Close': [1.0]})
+        calculator.history_cache.get.return_value = cached
+
+        with patch('data.market_calculator.yf.Ticker') as ticker_cls:
+            ticker_cls.return_value.history.return_value = cached
+            assert calculator._get_history('AAPL') is cached
+            calculator._get_history('AAPL', force_refresh=True)
+
+        ticker_cls.assert_called_once_with('AAPL', session=yahoo_session())
+        calculator.history_cache.set.assert_called_once()
+
+    def test_download_history_backs_off_on_rate_limit(self, calculator):
+        """Test that a yfinance 429 is retried after a jittered sleep."""
+        from yfinance.exceptions import YFRateLimitError
+        history = pd.DataFrame({'Close': [1.0]})
+
+        with patch('data.market_calculator.yf.Ticker') as ticker_cls, \
+             patch('data.market_calculator.time.sleep') as mock_sleep:
+            ticker_cls.return_value.history.side_effect = [YFRateLimitError(), history]
+            assert calculator._download_history('AAPL') is history
+
+        mock_sleep.assert_called_once()
+        assert 0 <= mock_sleep.call_args[0][0] <= 2
+
+    def test_download_history_from_chart_source(self, calculator):
+        """Test that HISTORY_SOURCE="chart" builds the frame from raw chart arrays."""
+        calculator.data_provider.raw_history.return_value = {
+            'timestamp': np.array([86400.0, 172800.0]),
+            'open': np.array([1.0, 2.0]),
+            'high': np.array([1.5, 2.5]),
+            'low': np.array([0.5, 1.5]),
+            'close': np.array([1.2, 2.2]),
+            'volume': np.array([10.0, 20.0]),
+        }
+
+        with patch('data.market_calculator.settings.HISTORY_SOURCE', 'chart'), \
+             patch('data.market_calculator.yf.Ticker') as ticker_cls:
+            history = calculator._download_history('AAPL')
+
+        ticker_cls.assert_not_called()
+        calculator.data_provider.raw_history.assert_called_once_with('AAPL', '1y')
+        assert history['Close'].tolist() == [1.2, 2.2]
+        assert list(history.columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+        assert history.index[0] == pd.Timestamp('1970-01-02')
+
+    def test_fetch_market_is_served_from_hourly_cache(self, calculator):
+        """Test that cached indicators skip the download and fresh ones are stored without a price."""
+        calculator.data_provider.get_current_price.return_value = 100.0
+        with patch.object(calculator, '_get_history', return_value=self._ohlcv(60, 7)):
+            calculator.fetch_market('aapl')
+        key, indicators = calculator.cache_manager.set.call_args[0]
+        calculator.cache_manager.get.return_value = indicators
+
+        with patch.object(calculator, '_get_history') as get_history:
+            result = calculator.fetch_market('aapl')
+
+        get_history.assert_not_called()
+        assert key.startswith('indicators:AAPL:') and len(key.split(':')[-1]) == 10
+        assert 'current_price' not in indicators
+        assert result['rsi'] == indicators['rsi']
+
+    def test_fetch_market_price_is_fresh_while_indicators_are_cached(self, calculator):
+        """Test that a new quote shows up even though the indicator entry is still warm."""
+        calculator.data_provider.get_current_price.return_value = 100.0
+        with patch.object(calculator, '_get_history', return_value=self._ohlcv(252, 8)):
+            first = calculator.fetch_market('AAPL')
+        calculator.cache_manager.get.return_value = calculator.cache_manager.set.call_args[0][1]
+        calculator.data_provider.get_current_price.return_value = 1_000.0
+
+        with patch.object(calculator, '_get_history') as get_history:
+            second = calculator.fetch_market('AAPL')
+
+        get_history.assert_not_called()
+        assert first['current_price'] == 100.0
+        assert second['current_price'] == second['ma_current'] == 1_000.0
+        assert second['bollinger_condition'] == 'overbought'
+        assert second['rsi'] == first['rsi']
+
+    def test_fetch_all_markets_computes_only_misses(self, calculator):
+        """Test that cached symbols come from one MGET and only misses are computed."""
+        calculator.data_provider.get_current_price.return_value = 100.0
+        with patch.object(calculator, '_get_history', return_value=self._ohlcv(60, 7)):
+            calculator.fetch_market('AAPL')
+        cached = calculator.cache_manager.set.call_args[0][1]
+        calculator.cache_manager.mget.side_effect = lambda keys: [cached, None]
+
+        with patch.object(calculator, '_get_history', return_value=self._ohlcv(60, 7)) as get_history:
+            result = calculator.fetch_all_markets(['AAPL', 'MSFT'])
+
+        assert list(result) == ['AAPL', 'MSFT']
+        assert result['AAPL']['rsi'] == cached['rsi']
+        assert result['AAPL']['current_price'] == result['MSFT']['current_price'] == 100.0
+        get_history.assert_called_once_with('MSFT')
+        calculator.cache_manager.mget.assert_called_once()
+        stored_key, stored = calculator.cache_manager.set.call_args[0]
+        assert stored_key.startswith('indicators:MSFT:') and 'current_price' not in stored
+
+    @staticmethod
+    def _ohlcv(rows, seed):
+        """Build a random daily OHLCV frame."""
+        rng = np.random.default_rng(seed)
+        close = 100 + rng.normal(0, 1, rows).cumsum()
+        return pd.DataFrame({
+            'Close': close,
+            'High': close + rng.uniform(0, 1, rows),
+            'Low': close - rng.uniform(0, 1, rows),
+            'Volume': rng.integers(1_000, 2_000, rows).astype(float),
+        })
+
+    def test_fetch_market_reads_price_once(self, calculator):
+        """Test that the current price is fetched once and shared by all indicators."""
+        calculator.data_provider.get_current_price.return_value = 100.0
+
+        with patch.object(calculator, '_get_history', return_value=self._ohlcv(252, 4)):
+            result = calculator.fetch_market('AAPL')
+
+        calculator.data_provider.get_current_price.assert_called_once_with('AAPL')
+        assert result['ma_current'] == 100.0
+
+    def test_fetch_all_markets_runs_concurrently(self, calculator):
+        """Test that histories are downloaded in parallel and results keep their order."""
+        import threading
+        barrier = threading.Barrier(3, timeout=2)
+
+        def get_history(symbol):
+            barrier.wait()
+            return self._ohlcv(60, len(symbol))
+
+        calculator.data_provider.get_current_price.return_value = 100.0
+        with patch.object(calculator, '_get_history', side_effect=get_history), \
+             patch('data.market_calculator.settings.MARKET_FETCH_CONCURRENCY', 3):
+            result = calculator.fetch_all_markets(['AAPL', 'MSFT', 'NVDA'])
+
+        assert list(result) == ['AAPL', 'MSFT', 'NVDA']
+        assert result['NVDA']['current_price'] == 100.0
+
+    def test_fetch_all_markets_workers_outlive_the_batch(self, calculator):
+        """Test that downloads run on long-lived threads, so sessions and Tickers are reused."""
+        import threading
+        workers = []
+
+        def get_history(symbol):
+            workers.append(threading.current_thread())
+            return self._ohlcv(60, 1)
+
+        calculator.data_provider.get_current_price.return_value = 100.0
+        with patch.object(calculator, '_get_history', side_effect=get_history):
+            calculator.fetch_all_markets(['AAPL', 'MSFT'])
+
+        assert len(workers) == 2 and all(thread.is_alive() for thread in workers)
+
+    def test_fetch_all_markets_matches_fetch_market(self, calculator):
+        """Test that the batched indicators agree with the per-symbol path."""
+        histories = {'LONG': self._ohlcv(252, 1), 'MID': self._ohlcv(60, 2), 'SHORT': self._ohlcv(10, 3)}
+        calculator.data_provider.get_current_price.return_value = 101.0
+
+        with patch.object(calculator, '_get_history', side_effect=histories.__getitem__):
+            batch = calculator.fetch_all_markets(list(histories))
+            for symbol in histories:
+                single = calculator.fetch_market(symbol)
+                self._assert_same(batch[symbol], single)
+
+    def test_fetch_all_markets_async_matches_sync(self, calculator):
+        """Test that the asyncio fan-out returns the same results as the pool."""
+        import asyncio
+        histories = {'AAPL': self._ohlcv(252, 5), 'MSFT': self._ohlcv(40, 6)}
+        calculator.data_provider.get_current_price.return_value = 99.0
+
+        with patch.object(calculator, '_get_history', side_effect=histories.__getitem__):
+            expected = calculator.fetch_all_markets(list(histories))
+            result = asyncio.run(calculator.fetch_all_markets_async(list(histories)))
+
+        assert list(result) == ['AAPL', 'MSFT']
+        for symbol in histories:
+            self._assert_same(result[symbol], expected[symbol])
+
+    @classmethod
+    def _assert_same(cls, actual, expected):
+        """Compare result dicts, treating NaN as equal and floats approximately."""
+        assert actual.keys() == expected.keys()
+        for key, value in expected.items():
+            if isinstance(value, dict):
+                cls._assert_same(actual[key], value)
+            elif isinstance(value, float):
+                assert actual[key] == pytest.approx(value, nan_ok=True), key
+            else:
+                assert actual[key] == value, key
+
+    def test_calculate_obv_matches_loop(self, calculator):
+        """Test that the vectorized OBV matches the step-by-step definition."""
+        rng = np.random.default_rng(1)
+        close = pd.Series(np.round(100 + rng.normal(0, 1, 63).cumsum(), 1))
+        close.iloc[10] = close.iloc[9]  # unchanged day keeps OBV flat
+        volume = pd.Series(rng.integers(1_000, 2_000, 63).astype(float))
+
+        expected = [0.0]
+        for i in range(1, len(close)):
+            step = np.sign(close.iloc[i] - close.iloc[i - 1]) * volume.iloc[i]
+            expected.append(expected[-1] + step)
+
+        result = calculator.calculate_obv(pd.DataFrame({'Close': close, 'Volume': volume}))
+
+        assert result['obv'] == pytest.approx(expected[-1])
+        assert result['obv_ma'] == pytest.approx(np.mean(expected[-20:]))
+
+    def test_calculate_macd_matches_ta(self, calculator):
+        """Test that the direct EWM MACD matches ta.trend.MACD."""
+        ta = pytest.importorskip('ta')
+        rng = np.random.default_rng(2)
+        close = pd.Series(100 + rng.normal(0, 1, 120).cumsum())
+
+        result = calculator.calculate_macd(pd.DataFrame({'Close': close}))
+
+        reference = ta.trend.MACD(close.tail(47), window_slow=26, window_fast=12, window_sign=9)
+        assert result['macd'] == pytest.approx(reference.macd().iloc[-1])
+        assert result['signal'] == pytest.approx(reference.macd_signal().iloc[-1])
+        assert result['histogram'] == pytest.approx(reference.macd_diff().iloc[-1])
+
+    def test_calculate_ma_short_history_is_nan(self, calculator):
+        """Test that a moving average needs its full window."""
+        history = pd.DataFrame({'Close': np.arange(1.0, 101.0)})
+
+        _, ma50, ma200, _ = calculator.calculate_ma(history, 100.0)
+
+        assert ma50 == pytest.approx(75.5)
+        assert np.isnan(ma200)
+
+    def test_calculate_adx_separates_trend_from_chop(self, calculator):
+        """Test that ADX is high for a steady trend and low for a choppy range."""
+        trend = np.arange(100.0, 300.0)
+        chop = 100 + np.tile([1.0, -1.0], 100)
+
+        trending = calculator.calculate_adx(pd.DataFrame({'High': trend + 1, 'Low': trend - 1, 'Close': trend}))
+        choppy = calculator.calculate_adx(pd.DataFrame({'High': chop + 1, 'Low': chop - 1, 'Close': chop}))
+
+        assert trending > 50
+        assert choppy < 20
+        assert 0 <= choppy <= trending <= 100
+
+    def test_calculate_rsi_uses_wilder_smoothing(self, calculator):
+        """Test RSI against a hand-rolled Wilder EMA and its edge cases."""
+        close = np.array([44.0, 44.3, 44.1, 44.6, 45.0, 44.8, 45.3, 45.9, 45.6, 46.2,
+                          46.0, 46.5, 46.1, 46.7, 47.0, 46.6, 46.9])
+        gains, losses = 0.0, 0.0
+        for i, d in enumerate(np.diff(close)):
+            g, l = max(d, 0.0), max(-d, 0.0)
+            gains = g if i == 0 else gains + (g - gains) / 14
+            losses = l if i == 0 else losses + (l - losses) / 14
+        expected = 100 - 100 / (1 + gains / losses)
+
+        assert calculator.calculate_rsi(pd.DataFrame({'Close': close})) == pytest.approx(expected)
+        assert calculator.calculate_rsi(pd.DataFrame({'Close': np.arange(20.0)})) == 100.0
+
+    def test_ticker_is_built_once_per_symbol(self, calculator):
+        """Test that repeated downloads reuse the same Ticker object."""
+        with patch('data.market_calculator.yf.Ticker') as ticker_cls:
+            ticker_cls.return_value.history.return_value = pd.DataFrame({'Close': [1.0]})
+            calculator._download_history('AAPL')
+            calculator._download_history('AAPL')
+
+        ticker_cls.assert_called_once_with('AAPL', session=yahoo_session())
+
+    def test_ticker_is_built_per_thread(self, calculator):
+        """Test that another thread builds its own Ticker on its own session."""
+        import threading
+        from data.market_calculator import _ticker
+
+        with patch('data.market_calculator.yf.Ticker') as ticker_cls:
+            _ticker('AAPL')
+            thread = threading.Thread(target=_ticker, args=('AAPL',))
+            thread.start()
+            thread.join()
+
+        sessions = [call.kwargs['session'] for call in ticker_cls.call_args_list]
+        assert len(sessions) == 2
+        assert sessions[0] is yahoo_session()
+        assert sessions[1] is not sessions[0]
+
+    @pytest.mark.parametrize('vix, expected', [
+        (9.9, 'extremely_calm'), (10, 'very_calm'), (19.99, 'calm'), (30, 'fear'),
+        (45, 'extreme_fear'), (55, 'extreme_panic'), (float('nan'), 'unknown'),
+    ])
+    def test_check_vix_condition(self, calculator, vix, expected):
+        """Test VIX bucket boundaries, including the extreme panic bucket."""
+        assert calculator.check_vix_condition(vix) == expected
+
+    @pytest.mark.parametrize('adx, expected', [
+        (5, 'weak trend'), (20, 'moderate trend'), (59.9, 'strong trend'), (60, 'very strong trend'),
+    ])
+    def test_check_adx_condition(self, calculator, adx, expected):
+        """Test ADX bucket boundaries."""
+        assert calculator.check_adx_condition(adx) == expected
+
+    def test_calculate_bollinger_bands_matches_rolling(self, calculator):
+        """Test that the last-window bands match the rolling pandas version."""
+        close = pd.Series(100 + np.random.default_rng(4).normal(0, 1, 63).cumsum())
+
+        upper, lower, middle = calculator.calculate_bollinger_bands(pd.DataFrame({'Close': close}))
+
+        mean = close.rolling(20).mean().iloc[-1]
+        std = close.rolling(20).std().iloc[-1]
+        assert (upper, lower, middle) == pytest.approx((mean + 2 * std, mean - 2 * std, mean))
+
+    def test_calculate_vix_matches_pandas(self, calculator):
+        """Test that the NumPy realized volatility matches the pandas version."""
+        closes = pd.Series([100.0, 101.5, 99.8, 102.2, 103.0, 101.1, 104.4])
+        expected = closes.pct_change().dropna().std() * np.sqrt(252) * 100
+
+        assert calculator.calculate_vix(pd.DataFrame({'Close': closes})) == pytest.approx(expected)
+
+    def test_fetch_market_downloads_history_once(self, calculator):
+        """Test that every indicator is computed from a single history download."""
+        rng = np.random.default_rng(0)
+        close = 100 + rng.normal(0, 1, 260).cumsum()
+        history = pd.DataFrame({
+            'Close': close,
+            'High': close + 1,
+            'Low': close - 1,
+            'Volume': rng.integers(1_000_000, 2_000_000, 260).astype(float),
+        })
+        calculator.data_provider.get_current_price.return_value = float(close[-1])
+
+        with patch('data.market_calculator.yf.Ticker') as ticker_cls:
+            ticker_cls.return_value.history.return_value = history
+            result = calculator.fetch_market('AAPL')
+
+        ticker_cls.return_value.history.assert_called_once_with(period='1y')
+        calculator.data_provider.get_current_price.assert_called_once_with('AAPL')
+        assert result['ma_50'] == pytest.approx(close[-50:].mean())
+        assert result['ma_100'] == pytest.approx(close[-200:].mean())
+        assert result['volume']['liquidity'] in ('low', 'normal', 'high')
@@ -0,0 +1,207 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+
+class TestRegimeGuardian:
+    """Test suite for the RegimeGuardian class."""
+
+    @pytest.fixture
+    def mock_cache(self):
+        """Create a mock CacheManager that always computes on get_or_set."""
+        cache = Mock()
+        cache.get_or_set.side_effect = lambda key, factory, ttl=None: factory()
+        return cache
+
+    @pytest.fixture
+    def guardian(self, mock_cache):
+        """Create a RegimeGuardian with mocked cache and calculator."""
+        with patch('core.regime_guardian.cache_manager.CacheManager', return_value=mock_cache), \
+             patch('core.regime_guardian.market_calculator.MarketCalculator', return_value=Mock()):
+            from core.regime_guardian import RegimeGuardian
+            return RegimeGuardian()
+
+    @pytest.fixture
+    def calm_data(self):
+        """Market data that triggers no veto on its own."""
+        return {
+            'rsi': 55,
+            'vix': 15,
+            'adx': 30,
+            'macd_result': 1,
+            'obv_divergence': None,
+            'volume': {'liquidity': 'normal'},
+            'bollinger_bands': {'position': 'inside', 'bandwidth': 0.1},
+        }
+
+    def test_guardian_has_no_instance_dict(self, guardian):
+        """Test that RegimeGuardian uses __slots__."""
+        assert not hasattr(guardian, '__dict__')
+
+    def test_calculator_built_once(self, mock_cache):
+        """Test that the guardian builds one MarketCalculator and reuses it."""
+        with patch('core.regime_guardian.cache_manager.CacheManager', return_value=mock_cache), \
+             patch('core.regime_guardian.market_calculator.MarketCalculator') as calculator_cls:
+            from core.regime_guardian import RegimeGuardian
+            guardian = RegimeGuardian()
+            calculator_cls.return_value.fetch_market.return_value = {}
+
+            guardian.classify_regime('AAPL')
+            guardian.classify_regime('MSFT')
+
+        calculator_cls.assert_called_once()
+        assert calculator_cls.return_value.fetch_market.call_count == 2
+
+    def test_classify_regime_is_cached_per_symbol(self, guardian, mock_cache):
+        """Test that the regime is read through the shared regime key."""
+        mock_cache.get_or_set.side_effect = None
+        mock_cache.get_or_set.return_value = 'BULL_TREND'
+
+        assert guardian.classify_regime('aapl') == 'BULL_TREND'
+        assert mock_cache.get_or_set.call_args[0][0] == 'shared:regime:AAPL'
+        guardian.mc.fetch_market.assert_not_called()
+
+    def test_injected_dependencies_are_used(self):
+        """Test that a shared cache and calculator can be passed in."""
+        from core.regime_guardian import RegimeGuardian
+        cache, mc = Mock(), Mock()
+
+        guardian = RegimeGuardian(cache=cache, mc=mc)
+
+        assert guardian.cache is cache
+        assert guardian.mc is mc
+
+    # --- should_veto: Critical Vetos ---
+
+    def test_veto_volatility_spike_is_critical(self, guardian, calm_data):
+        """Test that a volatility spike always blocks the trade."""
+        assert guardian.should_veto('AAPL', 'VOLATILITY_SPIKE', calm_data) == \
+            (True, "Market volatility too high (VIX > 30)", "CRITICAL")
+
+    def test_veto_low_volume_is_critical(self, guardian, calm_data):
+        """Test that low volume blocks the trade regardless of regime."""
+        calm_data['volume']['liquidity'] = 'low'
+        assert guardian.should_veto('AAPL', 'BULL_TREND', calm_data) == \
+            (True, "Low trading volume detected", "CRITICAL")
+
+    # --- should_veto: Regime Rules ---
+
+    def test_no_veto_for_clean_bull_trend(self, guardian, calm_data):
+        """Test that a healthy bull setup passes."""
+        assert guardian.should_veto('AAPL', 'BULL_TREND', calm_data) == (False, None, None)
+
+    def test_single_reason_is_medium(self, guardian, calm_data):
+        """Test that one veto reason gives MEDIUM severity."""
+        calm_data['rsi'] = 77
+        assert guardian.should_veto('AAPL', 'BULL_TREND', calm_data) == \
+            (True, "Severely overbought (RSI > 75)", "MEDIUM")
+
+    def test_multiple_reasons_are_high(self, guardian, calm_data):
+        """Test that regime and cross-indicator reasons combine in order."""
+        calm_data['rsi'] = 85
+        veto, reason, severity = guardian.should_veto('AAPL', 'BULL_TREND', calm_data)
+
+        assert veto is True
+        assert reason == "Severely overbought (RSI > 75); RSI extremely overbought (>80)"
+        assert severity == "HIGH"
+
+    def test_stagnation_always_vetoed(self, guardian, calm_data):
+        """Test that stagnant markets are always vetoed."""
+        calm_data['adx'] = 10
+        assert guardian.should_veto('AAPL', 'STAGNATION', calm_data) == \
+            (True, "Market stagnant - low profit opportunity", "MEDIUM")
+
+    def test_missing_indicators_use_defaults(self, guardian):
+        """Test that an empty payload does not raise."""
+        assert guardian.should_veto('AAPL', 'RANGE_BOUND', {}) == (False, None, None)
+
+    def test_nan_indicators_survive_cache_round_trip(self):
+        """Test that NaN indicators (stored as null) classify and veto like fresh data."""
+        from core.regime_guardian import RegimeGuardian
+        from data.cache_manager import CacheManager
+        store, ttls = {}, {}
+        client = Mock()
+        client.get.side_effect = store.get
+        client.ttl.side_effect = lambda key: ttls.get(key, -2)
+
+        def setex(key, ttl, value):
+            store[key], ttls[key] = value, ttl
+
+        client.setex.side_effect = setex
+        with patch.object(CacheManager, '_instance', None), \
+             patch('data.cache_manager.redis.Redis', return_value=client):
+            cache = CacheManager()
+        fresh = {'vix': float('nan'), 'adx': float('nan'), 'rsi': float('nan'),
+                 'bollinger_bands': {'bandwidth': float('nan')}, 'volume': {'liquidity': 'normal'}}
+        mc = Mock()
+        mc.fetch_market.return_value = fresh
+        guardian = RegimeGuardian(cache=cache, mc=mc)
+
+        guardian.get_market_data('AAPL')
+        cache._l1.clear()
+        cached = guardian.get_market_data('AAPL')
+
+        assert cached['adx'] is None
+        assert guardian.classify_regime('AAPL') == guardian._classify_impl('AAPL') == 'RANGE_BOUND'
+        assert guardian.should_veto('AAPL', 'RANGE_BOUND', cached) == \
+            guardian.should_veto('AAPL', 'RANGE_BOUND', fresh) == (False, None, None)
+
+    # --- classify_regime_batch Tests ---
+
+    def test_batch_matches_scalar_classification(self, guardian):
+        """Test that the vectorized classifier agrees with classify_regime."""
+        market_data = {
+            'SPIKE': {'vix': 35},
+            'THIN': {'vix': 10, 'volume': {'liquidity': 'low'}},
+            'BULL': {'vix': 10, 'adx': 30, 'macd_result': 0, 'ma': {'price_position': 'above'},
+                     'obv_trend': 'bullish'},
+            'BEAR': {'vix': 10, 'adx': 30, 'macd_result': 3, 'ma': {'price_position': 'below'},
+                     'obv_trend': 'bearish'},
+            'MIXED': {'vix': 10, 'adx': 30, 'macd_result': 0, 'ma': {'price_position': 'below'},
+                      'obv_trend': 'bullish'},
+            'FLAT': {'vix': 10, 'adx': 10, 'bollinger_bands': {'bandwidth': 0.01}},
+            'EDGE': {'vix': 30.0, 'adx': 25.0},
+            'EMPTY': {},
+        }
+
+        batch = guardian.classify_regimes(market_data)
+
+        with patch.object(type(guardian), 'get_market_data', lambda self, symbol: market_data[symbol]):
+            for symbol in market_data:
+                assert batch[symbol] == guardian.classify_regime(symbol)
+        assert batch['BULL'] == 'BULL_TREND'
+        assert batch['FLAT'] == 'STAGNATION'
+
+    def test_indicator_records_layout(self):
+        """Test that records are packed with the expected codes."""
+        from core.regime_guardian import INDICATOR_DTYPE, indicator_records
+        records = indicator_records({'AAPL': {'vix': 12.5, 'macd_result': 2, 'volume': {'liquidity': 'low'}}})
+
+        assert records.dtype == INDICATOR_DTYPE
+        assert records[0]['vix'] == 12.5
+        assert records[0]['macd_code'] == 2
+        assert records[0]['liq_code'] == 1
+        assert records[0]['pp_code'] == 0
+
+    # --- Async Fan-out Tests ---
+
+    def test_get_market_data_many_fetches_only_misses(self, guardian):
+        """Test that cached symbols are served from one MGET and misses go through aget_or_set."""
+        from data.cache_manager import SharedMarketCache
+        guardian.market_cache = SharedMarketCache(guardian.cache)
+        guardian.cache.amget = AsyncMock(return_value=[{'vix': 12}, None])
+
+        async def aget_or_set(key, factory, ttl):
+            return await factory()
+
+        guardian.cache.aget_or_set = AsyncMock(side_effect=aget_or_set)
+        guardian.mc.fetch_market.return_value = {'vix': 22}
+
+        result = asyncio.run(guardian.get_market_data_many(['AAPL', 'MSFT'], ttl=120))
+
+        assert result == {'AAPL': {'vix': 12}, 'MSFT': {'vix': 22}}
+        guardian.cache.amget.assert_awaited_once_with(['shared:market:AAPL', 'shared:market:MSFT'])
+        guardian.mc.fetch_market.assert_called_once_with('MSFT')
+        guardian.cache.aget_or_set.assert_awaited_once()
+        assert guardian.cache.aget_or_set.await_args.args[0] == 'shared:market:MSFT'
+        assert guardian.cache.aget_or_set.await_args.kwargs['ttl'] == 120